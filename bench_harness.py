@@ -0,0 +1,189 @@
+# bench_harness.py
+#
+# Offline fixtures for benchmarks.py: a local HTTP server that replays
+# recorded landing pages, and a fake Telegram Bot API with configurable
+# latency and 429 flood-control responses. Nothing here touches the network.
+#
+# Recording (needs network, run once): python benchmarks.py record
+
+import html
+import json
+import os
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+SNAPSHOT_DIR = os.path.join("bench_fixtures", "pages")
+
+
+def slugify(name):
+    return re.sub(r"\W+", "-", name.lower()).strip("-")
+
+
+def synthetic_snapshot(product):
+    """
+    Stand-in page for products without a recording: meta tags, a hero image
+    and a mix of offer and filler list items.
+    """
+    name = html.escape(product.get("name", "Product"))
+    desc = html.escape(product.get("desc", f"{name} landing page"))
+    offers = "\n".join(
+        f"<li>{name} plan {i}: save {10 + i}% on yearly billing, free onboarding</li>" for i in range(6)
+    )
+    filler = "\n".join(f"<li>{name} feature {i} for teams and individuals</li>" for i in range(40))
+    return f"""<!doctype html><html><head><title>{name}</title>
+<meta property="og:image" content="/static/{slugify(product.get('name', 'product'))}-og.png">
+<meta name="description" content="{desc}"></head>
+<body><header><img src="/static/logo.svg" alt="{name} logo"></header>
+<p>{desc}</p><ul>{offers}{filler}</ul>
+<img src="/static/hero.png" width="800" height="400"></body></html>"""
+
+
+async def record_snapshots(products, snapshot_dir=SNAPSHOT_DIR):
+    """
+    Renders each product's website in Chromium and stores the resulting DOM,
+    with <script> tags removed so replays are deterministic and offline.
+    """
+    from playwright.async_api import async_playwright
+    from utils import wait_for_page_ready
+
+    os.makedirs(snapshot_dir, exist_ok=True)
+    async with async_playwright() as p:
+        browser = await p.chromium.launch(headless=True)
+        page = await browser.new_page()
+        for product in products:
+            url = product.get("website")
+            if not url:
+                continue
+            try:
+                await wait_for_page_ready(page, url)
+                content = await page.content()
+            except Exception as e:
+                print(f"skip {product['name']}: {e}")
+                continue
+            content = re.sub(r"<script\b[^>]*>.*?</script>", "", content, flags=re.S | re.I)
+            with open(os.path.join(snapshot_dir, slugify(product["name"]) + ".html"), "w", encoding="utf-8") as f:
+                f.write(content)
+            print(f"recorded {product['name']} ({len(content) // 1024} KB)")
+        await browser.close()
+
+
+class _QuietHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+class BackgroundServer:
+    """
+    Runs a ThreadingHTTPServer on a free localhost port in a daemon thread.
+    """
+    def __init__(self, handler):
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}"
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def page_server(products, snapshot_dir=SNAPSHOT_DIR):
+    """
+    Serves /<slug>/ (query string ignored) for each product: its recorded
+    snapshot if there is one, otherwise synthetic_snapshot(). Anything else
+    (images, etc.) is a 404.
+    """
+    pages = {}
+    for product in products:
+        slug = slugify(product["name"])
+        path = os.path.join(snapshot_dir, slug + ".html")
+        if os.path.exists(path):
+            with open(path, "rb") as f:
+                pages[slug] = f.read()
+        else:
+            pages[slug] = synthetic_snapshot(product).encode("utf-8")
+
+    class Handler(_QuietHandler):
+        def _page(self):
+            return pages.get(self.path.split("?")[0].strip("/").split("/")[0])
+
+        def _send_headers(self, body):
+            self.send_response(200 if body is not None else 404)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(body or b"")))
+            self.send_header("ETag", f'"{hash(body)}"')
+            self.end_headers()
+
+        def do_HEAD(self):
+            self._send_headers(self._page())
+
+        def do_GET(self):
+            body = self._page()
+            self._send_headers(body)
+            if body:
+                self.wfile.write(body)
+
+    return BackgroundServer(Handler)
+
+
+def fake_telegram(latency_ms=50, rate_limit_every=0, retry_after=1):
+    """
+    Fake Bot API answering sendMessage/sendPhoto after `latency_ms`. With
+    rate_limit_every=N, every Nth call gets a 429 with `retry_after`.
+    The returned server has a `stats` dict with call counts.
+    """
+    lock = threading.Lock()
+    stats = {"calls": 0, "rate_limited": 0, "sent": 0}
+
+    class Handler(_QuietHandler):
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            time.sleep(latency_ms / 1000)
+            with lock:
+                stats["calls"] += 1
+                limited = rate_limit_every and stats["calls"] % rate_limit_every == 0
+                if limited:
+                    stats["rate_limited"] += 1
+                elif self.path.rsplit("/", 1)[-1] in ("sendMessage", "sendPhoto"):
+                    stats["sent"] += 1
+                message_id = stats["calls"]
+
+            if limited:
+                status, body = 429, {"ok": False, "error_code": 429,
+                                     "description": f"Too Many Requests: retry after {retry_after}",
+                                     "parameters": {"retry_after": retry_after}}
+            elif self.path.rsplit("/", 1)[-1] in ("sendMessage", "sendPhoto"):
+                status, body = 200, {"ok": True, "result": {"message_id": message_id}}
+            else:
+                status, body = 404, {"ok": False, "error_code": 404, "description": "Not Found"}
+            data = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+    server = BackgroundServer(Handler)
+    server.stats = stats
+    return server
+
+
+def scaled_products(catalog, n, base_url):
+    """
+    n products cycled from the catalog, renamed so each is unique, with their
+    websites pointed at the local page server (copies share the snapshot).
+    """
+    products = []
+    for i in range(n):
+        product = dict(catalog[i % len(catalog)])
+        copy = i // len(catalog)
+        product["website"] = f"{base_url}/{slugify(product['name'])}/?copy={copy}"
+        if copy:
+            product["name"] = f"{product['name']} #{copy}"
+        products.append(product)
+    return products
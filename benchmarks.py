@@ -0,0 +1,551 @@
+# benchmarks.py
+#
+# Local, network-free benchmarks for the bot's hot paths.
+# Usage: python benchmarks.py <name> [options]
+#
+#   extraction  in-page extraction vs the old per-element path
+#   selection   category index vs match_category scans (100k products)
+#   offline     end-to-end scenarios against bench_harness' local servers
+#   record      save landing-page snapshots for offline (needs network)
+#   offers      batched offer ranking vs the old per-string filter loops
+#   catalog     peak memory of selection: JSON array vs streamed JSON lines
+#   startup     import time of each main.py command, and whether it loads Playwright
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import re
+import shutil
+import sys
+import tempfile
+import time
+import datetime
+from urllib.parse import urljoin
+
+from dom_extract import (
+    OFFER_KEYWORDS, PRIORITIZED_IMAGE_SELECTORS, IMAGE_EXTENSIONS,
+    build_plan, collect_candidates, resolve_all, looks_valid_img,
+)
+
+BENCH_URL = "https://bench.example.com/"
+
+
+# --- Round-trip counting ---
+
+class CountingProxy:
+    """
+    Wraps a Playwright page/element handle and counts every awaited call,
+    i.e. every CDP round trip. Returned handles are wrapped too.
+    """
+    def __init__(self, target, counter):
+        self._target = target
+        self._counter = counter
+
+    def __getattr__(self, name):
+        attr = getattr(self._target, name)
+        if not asyncio.iscoroutinefunction(attr):
+            return attr
+
+        async def counted(*args, **kwargs):
+            self._counter["round_trips"] += 1
+            result = await attr(*args, **kwargs)
+            if isinstance(result, list):
+                return [CountingProxy(r, self._counter) for r in result]
+            if result is not None and hasattr(result, "get_attribute"):
+                return CountingProxy(result, self._counter)
+            return result
+        return counted
+
+
+def synthetic_landing_page(n_items):
+    """
+    A content-heavy landing page with no og/twitter image, so the whole image
+    fallback chain has to run.
+    """
+    items = "\n".join(
+        f"<li>Plan {i}: save {i % 50}% on annual billing, free setup included</li>" if i % 3 == 0
+        else f"<li>Feature {i}: collaborative editing and version history</li>"
+        for i in range(n_items)
+    )
+    paras = "\n".join(f"<p>Paragraph {i} about the product and its benefits.</p>" for i in range(n_items // 4))
+    imgs = "\n".join(f'<img src="/static/shot-{i}.gif" width="40" height="40">' for i in range(n_items // 10))
+    return f"""<html><head><meta name="description" content="Benchmark product page"></head>
+<body><header><img src="/static/icon-menu.svg"></header>
+<div style="color: red">{paras}</div><ul>{items}</ul>{imgs}
+<img src="/static/hero.gif" width="600" height="300"></body></html>"""
+
+
+async def legacy_extract(page, url):
+    """
+    The previous element-by-element extraction (one await per element),
+    kept here as the baseline for bench_extraction().
+    """
+    offers, image, desc = [], None, ""
+    og_image = await page.query_selector('meta[property="og:image"]')
+    if og_image:
+        image = await og_image.get_attribute('content')
+    if not image:
+        tw_img = await page.query_selector('meta[name="twitter:image"]')
+        if tw_img:
+            image = await tw_img.get_attribute('content')
+    if not image:
+        header_imgs = await page.query_selector_all('header img, nav img')
+        checked_imgs = header_imgs or await page.query_selector_all('img')
+        for img in checked_imgs[:8]:
+            src = await img.get_attribute('src')
+            if src:
+                src = src if src.startswith('http') else urljoin(url, src)
+                if looks_valid_img(src) and src.lower().endswith(IMAGE_EXTENSIONS):
+                    image = src
+                    break
+    if not image:
+        for sel in PRIORITIZED_IMAGE_SELECTORS:
+            for elem in await page.query_selector_all(sel):
+                src = await elem.get_attribute('src')
+                if src and looks_valid_img(src):
+                    image = src if src.startswith("http") else urljoin(url, src)
+                    break
+            if image:
+                break
+    if not image:
+        for elem in await page.query_selector_all('[style*="background"]'):
+            style = await elem.get_attribute('style')
+            match = re.search(r'background(-image)?\s*:\s*url\([\'"]?([^)\'"]+)', style or '', re.I)
+            if match and looks_valid_img(match.group(2)):
+                image = urljoin(url, match.group(2))
+                break
+    if not image:
+        fav_icon = await page.query_selector('link[rel="icon"], link[rel="shortcut icon"]')
+        if fav_icon:
+            relimg = await fav_icon.get_attribute('href')
+            if relimg and looks_valid_img(urljoin(url, relimg)):
+                image = urljoin(url, relimg)
+    if not image:
+        max_area, best_img = 0, None
+        for img in await page.query_selector_all('img'):
+            src = await img.get_attribute('src')
+            box = await img.bounding_box()
+            if not src or not looks_valid_img(src) or not box:
+                continue
+            area = (box['width'] or 1) * (box['height'] or 1)
+            if area > max_area and area > 2500:
+                max_area, best_img = area, src
+        if best_img:
+            image = urljoin(url, best_img)
+
+    meta_desc = await page.query_selector('meta[name="description"]')
+    if meta_desc:
+        desc = await meta_desc.get_attribute('content')
+    for elem in await page.query_selector_all('li, p'):
+        text = await elem.inner_text()
+        if any(keyword in text.lower() for keyword in OFFER_KEYWORDS):
+            txt = text.strip().replace('\n', ' ')
+            if 10 <= len(txt) <= 300 and txt not in offers:
+                offers.append(txt)
+    return offers[:8], image, desc
+
+
+async def evaluate_extract(page, url):
+    plan = build_plan()
+    return resolve_all(plan, await collect_candidates(page, plan), url)
+
+
+async def bench_extraction(sizes=(50, 500, 2000), repeat=3):
+    """
+    Compares CDP round trips and wall time of the legacy per-element path
+    against the strategy engine's single page.evaluate() on synthetic pages.
+    """
+    from playwright.async_api import async_playwright
+
+    async with async_playwright() as p:
+        browser = await p.chromium.launch(headless=True)
+        page = await browser.new_page()
+        print(f"{'items':>6} {'path':>9} {'round trips':>12} {'best ms':>9}  image")
+        for n in sizes:
+            await page.set_content(synthetic_landing_page(n))
+            for label, func in (("legacy", legacy_extract), ("evaluate", evaluate_extract)):
+                best, counter, result = None, None, None
+                for _ in range(repeat):
+                    counter = {"round_trips": 0}
+                    start = time.perf_counter()
+                    result = await func(CountingProxy(page, counter), BENCH_URL)
+                    elapsed = (time.perf_counter() - start) * 1000
+                    best = elapsed if best is None else min(best, elapsed)
+                print(f"{n:>6} {label:>9} {counter['round_trips']:>12} {best:>9.1f}  {result[1]}")
+        await browser.close()
+
+
+# --- Offer text processing ---
+
+def synthetic_offer_texts(n, seed=0):
+    """
+    n candidate texts as a large page yields them: real offers (repeated with
+    case/spacing changes), account chrome with offer words, and filler.
+    """
+    rng = random.Random(seed)
+    offers = [f"Save {rng.randint(5, 70)}% on the {w} plan, billed yearly" for w in ("pro", "team", "business")]
+    offers += ["Free 14 day trial, no credit card", "Get 2 months free with annual billing",
+               "Black Friday deal: $20 off lifetime license"]
+    chrome = ["Add to wishlist to save for later", "Login to see your discount",
+              "Notify me when back in stock", "Set a price drop reminder"]
+    filler = ["Works on Windows, macOS and Linux", "Trusted by 10,000 teams", "Read the documentation"]
+    texts = []
+    for _ in range(n):
+        roll = rng.random()
+        if roll < 0.3:
+            text = rng.choice(offers)
+            texts.append(text.upper() if rng.random() < 0.2 else f"  {text}\n ")
+        elif roll < 0.5:
+            texts.append(rng.choice(chrome))
+        else:
+            texts.append(f"{rng.choice(filler)} #{rng.randint(0, n)}")
+    return texts
+
+
+def legacy_offer_pipeline(texts):
+    """
+    The old path: keyword any() + list-membership dedup at extraction, then
+    format_offers' clean/escape/skip-term loop with a second list dedup.
+    """
+    from utils import clean_text
+
+    offers = []
+    for text in texts:
+        if any(keyword in text.lower() for keyword in OFFER_KEYWORDS):
+            txt = text.strip().replace('\n', ' ')
+            if 10 <= len(txt) <= 300 and txt not in offers:
+                offers.append(txt)
+    skip_terms = ['wishlist', 'offer t&cs', 'notify', 'login', 'reminder', 'events', 'stock', 'price drop']
+    clean_offers = []
+    for offer in offers[:8]:
+        txt = clean_text(offer).replace('\n', ' ').strip()
+        if any(term in txt.lower() for term in skip_terms):
+            continue
+        if txt and len(txt) >= 10 and txt not in clean_offers:
+            clean_offers.append(txt)
+        if len(clean_offers) >= 3:
+            break
+    return clean_offers
+
+
+def batched_offer_pipeline(texts):
+    from offer_text import rank_offers
+
+    return rank_offers(rank_offers(texts), keywords=None, limit=3, max_len=None)
+
+
+def bench_offers(sizes=(1000, 10_000, 50_000), repeat=3):
+    """
+    Old per-string offer filtering vs offer_text.rank_offers on synthetic
+    candidate lists, plus how many distinct offers each path ends up with.
+    """
+    print(f"{'texts':>7} {'path':>8} {'best ms':>9}  top offers")
+    for n in sizes:
+        texts = synthetic_offer_texts(n)
+        for label, func in (("legacy", legacy_offer_pipeline), ("batched", batched_offer_pipeline)):
+            best, result = None, None
+            for _ in range(repeat):
+                start = time.perf_counter()
+                result = func(texts)
+                elapsed = (time.perf_counter() - start) * 1000
+                best = elapsed if best is None else min(best, elapsed)
+            print(f"{n:>7} {label:>8} {best:>9.2f}  {result}")
+
+
+def synthetic_catalog(n, seed=0):
+    rng = random.Random(seed)
+    words = ["cloud", "team", "photo", "budget", "vpn", "travel", "editor", "academy", "notes",
+             "server", "design", "invoice", "booking", "video", "suite", "pro", "lab", "hub"]
+    return [
+        {
+            "name": f"Product {i}",
+            "website": f"https://{rng.choice(words)}{i}.example.com/",
+            "category": rng.choice(words).title(),
+            "tags": rng.sample(words, 2),
+            "desc": " ".join(rng.choice(words) for _ in range(12)),
+        }
+        for i in range(n)
+    ]
+
+
+def bench_selection(n=100_000, category="creativity"):
+    """
+    Category eligibility on a synthetic catalog: per-call match_category scans
+    (previous behaviour) vs the persisted inverted index, cold and warm.
+    """
+    import generate_today_products as gtp
+
+    products = synthetic_catalog(n)
+    posted = {f"Product {i}" for i in range(0, n, 7)}
+    keywords = gtp.CATEGORY_KEYWORDS[category]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        catalog_path = os.path.join(tmp, "catalog.json")
+        index_path = os.path.join(tmp, "catalog.index.json")
+        with open(catalog_path, "w", encoding="utf-8") as f:
+            json.dump(products, f)
+
+        def timed(label, func):
+            start = time.perf_counter()
+            result = func()
+            print(f"{label:<34} {(time.perf_counter() - start) * 1000:>10.1f} ms")
+            return result
+
+        print(f"{n} products, category '{category}'")
+        legacy = timed("scan with match_category", lambda: [
+            p for p in products if gtp.match_category(p, keywords) and p["name"] not in posted
+        ])
+        timed("index build (cold)", lambda: gtp.load_category_index(products, catalog_path, index_path))
+        index = timed("index load (warm, mtime match)", lambda: gtp.load_category_index(None, catalog_path, index_path))
+
+        def select():
+            names = gtp.category_names(index, category) - posted
+            return [p for p in products if p["name"] in names]
+        indexed = timed("eligibility via index", select)
+        assert [p["name"] for p in legacy] == [p["name"] for p in indexed]
+
+        from selection import weighted_sample, make_weight
+
+        last_posted = {f"Product {i}": "2026-01-01" for i in range(0, n, 3)}
+        weight = make_weight(last_posted, today=datetime.date(2026, 1, 5))
+        picks = [timed(f"weighted sample, k=5, seed {seed}", lambda: weighted_sample(indexed, 5, weight, random.Random(seed)))
+                 for seed in (0, 0)]
+        assert picks[0] == picks[1]
+
+
+def bench_catalog(sizes=(10_000, 50_000, 100_000), category="creativity", k=5):
+    """
+    Peak traced memory and time of selection's weighted_sample() picking k
+    eligible products from a JSON-array catalog (loaded whole) vs a streamed
+    JSON-lines one. Eligibility comes from the category index in both cases
+    and isn't counted.
+    """
+    import tracemalloc
+    import generate_today_products as gtp
+    from catalog import iter_products
+    from selection import weighted_sample, make_weight
+
+    print(f"{'products':>9} {'path':>7} {'peak MB':>9} {'ms':>9}")
+    for n in sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            json_path = os.path.join(tmp, "catalog.json")
+            jsonl_path = os.path.join(tmp, "catalog.jsonl")
+            products = synthetic_catalog(n)
+            with open(json_path, "w", encoding="utf-8") as f:
+                json.dump(products, f)
+            with open(jsonl_path, "w", encoding="utf-8") as f:
+                f.writelines(json.dumps(p) + "\n" for p in products)
+            del products
+            index = gtp.load_category_index(None, jsonl_path, os.path.join(tmp, "catalog.index.json"))
+            names = gtp.category_names(index, category)
+            weight = make_weight({f"Product {i}": "2026-01-01" for i in range(0, n, 3)}, datetime.date(2026, 1, 5))
+
+            def pick(path):
+                eligible = (p for p in iter_products(path) if p["name"] in names)
+                return weighted_sample(eligible, k, weight, random.Random(0))
+
+            for label, path in (("json", json_path), ("jsonl", jsonl_path)):
+                func = lambda: pick(path)  # noqa: E731
+                start = time.perf_counter()
+                func()
+                elapsed = (time.perf_counter() - start) * 1000
+                # Separate traced run: tracemalloc slows allocation-heavy code down
+                tracemalloc.start()
+                func()
+                peak = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+                print(f"{n:>9} {label:>7} {peak / 2**20:>9.1f} {elapsed:>9.1f}")
+
+
+# --- Offline end-to-end scenarios (local page server + fake Telegram) ---
+
+def print_result(scenario, n, total_s, latencies_ms=None, extra=""):
+    from instrumentation import percentile
+
+    line = f"{scenario:<24} {n:>5} {total_s:>9.2f}s {n / total_s if total_s else 0:>9.1f}/s"
+    if latencies_ms:
+        line += f"  p50 {percentile(latencies_ms, 50):>8.1f} ms  p95 {percentile(latencies_ms, 95):>8.1f} ms"
+    print(line + (f"  {extra}" if extra else ""))
+
+
+async def timed_each(items, func):
+    latencies = []
+    start = time.perf_counter()
+    for item in items:
+        t = time.perf_counter()
+        await func(item)
+        latencies.append((time.perf_counter() - t) * 1000)
+    return time.perf_counter() - start, latencies
+
+
+async def offline_scenarios(main_module, catalog, n, args):
+    from bench_harness import page_server, fake_telegram, scaled_products
+    from playwright.async_api import async_playwright
+    from telegram_sender import TelegramSender
+    import generate_today_products as gtp
+
+    with page_server(catalog) as pages, fake_telegram(args.tg_latency_ms, args.tg_429_every) as tg:
+        products = scaled_products(catalog, n, pages.url)
+
+        # generate_today_products over an n-product catalog
+        with open(gtp.PRODUCTS_FILE, "w", encoding="utf-8") as f:
+            json.dump(products, f, ensure_ascii=False)
+        start = time.perf_counter()
+        gtp.generate_today_products()
+        print_result("generate_today_products", n, time.perf_counter() - start)
+
+        # extract_offers_and_image, one page, product after product
+        async with async_playwright() as p:
+            browser = await p.chromium.launch(headless=True)
+            page = await browser.new_page()
+            total, latencies = await timed_each(
+                products, lambda product: main_module.extract_offers_and_image(page, product["website"])
+            )
+            await browser.close()
+        print_result("extract_offers_and_image", n, total, latencies)
+
+        # run_scraper through the HTTP tier, then forced into the browser
+        for label, needs_js in (("run_scraper (http)", False), ("run_scraper (browser)", True)):
+            with open("software_affiliates.json", "w", encoding="utf-8") as f:
+                json.dump([{**product, "needs_js": needs_js} for product in products], f, ensure_ascii=False)
+            start = time.perf_counter()
+            await main_module.run_scraper(refresh=True)
+            print_result(label, n, time.perf_counter() - start)
+
+        # send_post against the fake Bot API
+        sender = TelegramSender("bench", api_base=tg.url, global_rate=args.tg_rate,
+                                chat_rate_per_min=args.tg_rate * 60)
+        total, latencies = await timed_each(
+            products, lambda product: main_module.send_post(sender, product, "@bench")
+        )
+        print_result("send_post", n, total, latencies,
+                     f"{tg.stats['sent']} sent, {tg.stats['rate_limited']} rate-limited")
+
+
+def bench_offline(args):
+    """
+    End-to-end scenarios against local servers only: selection, extraction,
+    run_scraper (HTTP and browser tiers) and send_post for each product count.
+    Runs in a scratch directory so the repo's JSON state is left alone.
+    """
+    from bench_harness import SNAPSHOT_DIR
+
+    repo_dir = os.path.dirname(os.path.abspath(__file__))
+    with open(os.path.join(repo_dir, "software_products.json"), "r", encoding="utf-8") as f:
+        catalog = json.load(f)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        shutil.copy(os.path.join(repo_dir, "software_products.json"), tmp)
+        if os.path.isdir(os.path.join(repo_dir, SNAPSHOT_DIR)):
+            shutil.copytree(os.path.join(repo_dir, SNAPSHOT_DIR), os.path.join(tmp, SNAPSHOT_DIR))
+        cwd = os.getcwd()
+        os.chdir(tmp)
+        try:
+            sys.path.insert(0, repo_dir)
+            import main as main_module
+
+            print(f"{'scenario':<24} {'n':>5} {'total':>10} {'throughput':>11}")
+            for n in args.products:
+                asyncio.run(offline_scenarios(main_module, catalog, n, args))
+        finally:
+            os.chdir(cwd)
+
+
+def import_profile(stderr):
+    """
+    (total import ms, imported module names) from `python -X importtime` output.
+    """
+    total_us, modules = 0, []
+    for line in stderr.splitlines():
+        match = re.match(r"import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)", line)
+        if match:
+            total_us += int(match.group(1))
+            modules.append(match.group(4))
+    return total_us / 1000, modules
+
+
+def bench_startup(args):
+    """
+    Runs `main.py select` and `main.py post` (against the fake Bot API, with
+    no images) in a scratch directory under -X importtime, next to a bare
+    Playwright import for scale.
+    """
+    import subprocess
+    from bench_harness import fake_telegram
+
+    repo_dir = os.path.dirname(os.path.abspath(__file__))
+    main_py = os.path.join(repo_dir, "main.py")
+    with tempfile.TemporaryDirectory() as tmp, fake_telegram(latency_ms=0) as tg:
+        shutil.copy(os.path.join(repo_dir, "software_products.json"), tmp)
+        env = {**os.environ, "BOT_TOKEN": "bench", "CHANNEL_ID": "@bench", "TELEGRAM_API_BASE": tg.url,
+               "TELEGRAM_CHAT_RATE_PER_MIN": "6000",
+               "HISTORY_DIR": os.path.join(tmp, "post_history"), "REPORT_FILE": os.path.join(tmp, "reports.jsonl")}
+        commands = [
+            ("main.py select", [main_py, "select"]),
+            ("main.py post", [main_py, "post"]),
+            ("import playwright", ["-c", "import playwright.async_api"]),
+        ]
+        print(f"{'command':<20} {'wall':>9} {'imports':>9} {'modules':>8}  playwright")
+        for label, cmd in commands:
+            if label == "main.py post":
+                # The products select just wrote, minus images so nothing leaves the machine
+                with open(os.path.join(tmp, "software_affiliates.json"), "r", encoding="utf-8") as f:
+                    products = [{k: v for k, v in p.items() if k != "image"} for p in json.load(f)]
+                with open(os.path.join(tmp, "software_affiliates.json"), "w", encoding="utf-8") as f:
+                    json.dump(products, f, ensure_ascii=False)
+            walls, imports = [], []
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                result = subprocess.run([sys.executable, "-X", "importtime", *cmd], cwd=tmp, env=env,
+                                        capture_output=True, text=True)
+                walls.append((time.perf_counter() - start) * 1000)
+                import_ms, modules = import_profile(result.stderr)
+                imports.append(import_ms)
+            if result.returncode and label.startswith("import"):
+                print(f"{label:<20} {'(not installed)':>28}")
+                continue
+            loads_playwright = "yes" if any(m.startswith("playwright") for m in modules) else "no"
+            print(f"{label:<20} {min(walls):>7.0f}ms {min(imports):>7.0f}ms {len(modules):>8}  {loads_playwright}")
+
+
+def record_pages(args):
+    from bench_harness import record_snapshots
+
+    with open("software_products.json", "r", encoding="utf-8") as f:
+        asyncio.run(record_snapshots(json.load(f)))
+
+
+BENCHMARKS = {
+    "extraction": lambda args: asyncio.run(bench_extraction(tuple(args.sizes or (50, 500, 2000)), args.repeat)),
+    "selection": lambda args: bench_selection(args.catalog_size),
+    "offline": bench_offline,
+    "record": record_pages,
+    "offers": lambda args: bench_offers(tuple(args.sizes or (1000, 10_000, 50_000)), args.repeat),
+    "startup": bench_startup,
+    "catalog": lambda args: bench_catalog(tuple(args.sizes or (10_000, 50_000, 100_000))),
+}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run local performance benchmarks.")
+    parser.add_argument("name", choices=sorted(BENCHMARKS))
+    parser.add_argument("--sizes", type=int, nargs="+",
+                        help="Number of candidate nodes / items per scenario")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--catalog-size", type=int, default=100_000,
+                        help="Synthetic catalog size for the selection benchmark")
+    parser.add_argument("--products", type=int, nargs="+", default=[1, 10, 100],
+                        help="Product counts for the offline scenarios")
+    parser.add_argument("--tg-latency-ms", type=int, default=50, help="Fake Telegram response latency")
+    parser.add_argument("--tg-429-every", type=int, default=0,
+                        help="Fake Telegram answers every Nth call with 429 (0 = never)")
+    parser.add_argument("--tg-rate", type=float, default=30,
+                        help="Messages/second the sender may send to the fake chat")
+    args = parser.parse_args(argv)
+    BENCHMARKS[args.name](args)
+
+
+if __name__ == "__main__":
+    main()
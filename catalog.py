@@ -0,0 +1,60 @@
+# catalog.py
+#
+# Streaming access to the product catalog. Besides the original JSON array
+# (software_products.json) the catalog can be stored as JSON lines, one
+# product per line, which is read one record at a time: selection keeps
+# only the products it samples, so memory stays flat as the catalog grows.
+# Set CATALOG_FILE=software_products.jsonl to use it.
+#
+# Usage: python catalog.py convert [software_products.json] [software_products.jsonl]
+
+import argparse
+import json
+
+from config import CATALOG_FILE
+from utils import write_jsonl_atomic
+
+
+def is_jsonl(path):
+    return path.endswith((".jsonl", ".ndjson"))
+
+
+def iter_products(path=CATALOG_FILE):
+    """
+    Yields the catalog's products in order. JSON lines are streamed; a JSON
+    array has to be loaded whole, so convert large catalogs first.
+    """
+    if not is_jsonl(path):
+        with open(path, "r", encoding="utf-8") as f:
+            yield from json.load(f)
+        return
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
+
+
+def convert_to_jsonl(src, dst):
+    """
+    Rewrites a JSON-array catalog as JSON lines (atomically). Returns the product count.
+    """
+    with open(src, "r", encoding="utf-8") as f:
+        products = json.load(f)
+    write_jsonl_atomic(dst, products)
+    return len(products)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Catalog format tools.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    convert = sub.add_parser("convert", help="Convert a JSON-array catalog to JSON lines")
+    convert.add_argument("src", nargs="?", default="software_products.json")
+    convert.add_argument("dst", nargs="?", default="software_products.jsonl")
+    args = parser.parse_args(argv)
+    n = convert_to_jsonl(args.src, args.dst)
+    print(f"✅ Wrote {n} products to {args.dst}")
+
+
+if __name__ == "__main__":
+    main()
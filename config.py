@@ -2,4 +2,78 @@ import os
 
 BOT_TOKEN = os.environ.get("BOT_TOKEN")
 CHANNEL_ID = os.environ.get("CHANNEL_ID")
-POST_DELAY = int(os.environ.get("POST_DELAY", "2"))  # default 2 seconds if not set
+# CHANNEL_ID may list several channels, comma-separated; each gets every post
+CHANNEL_IDS = [c.strip() for c in (CHANNEL_ID or "").split(",") if c.strip()]
+
+# Telegram rate limits: ~30 messages/s per bot, ~20 messages/min per channel
+TELEGRAM_API_BASE = os.environ.get("TELEGRAM_API_BASE", "https://api.telegram.org")
+TELEGRAM_GLOBAL_RATE = float(os.environ.get("TELEGRAM_GLOBAL_RATE", "30"))
+TELEGRAM_CHAT_RATE_PER_MIN = float(os.environ.get("TELEGRAM_CHAT_RATE_PER_MIN", "20"))
+TELEGRAM_MAX_RETRIES = int(os.environ.get("TELEGRAM_MAX_RETRIES", "4"))
+
+# Scraping: how many sites are rendered at once, and the hard per-site limit (seconds)
+SCRAPE_CONCURRENCY = int(os.environ.get("SCRAPE_CONCURRENCY", "4"))
+SCRAPE_SITE_TIMEOUT = int(os.environ.get("SCRAPE_SITE_TIMEOUT", "60"))
+# Upper bound on waiting for a page to settle after DOMContentLoaded (ms).
+# Products can override it with a "max_wait_ms" field in the catalog.
+PAGE_READY_TIMEOUT_MS = int(os.environ.get("PAGE_READY_TIMEOUT_MS", "5000"))
+# Abort image/media/font/tracker requests while scraping ("1" to enable)
+BLOCK_HEAVY_RESOURCES = os.environ.get("BLOCK_HEAVY_RESOURCES", "0") == "1"
+
+# Warm scrape worker (python main.py worker). SCRAPE_WORKER: "auto" uses it when it
+# answers and launches Chromium in-process otherwise; "off" never tries it.
+SCRAPE_WORKER = os.environ.get("SCRAPE_WORKER", "auto")
+SCRAPE_WORKER_ADDRESS = os.environ.get("SCRAPE_WORKER_ADDRESS", "127.0.0.1:8765")
+WORKER_RECYCLE_AFTER = int(os.environ.get("WORKER_RECYCLE_AFTER", "50"))  # pages per browser context
+
+# Product catalog: a JSON array, or JSON lines (.jsonl) to stream large catalogs (see catalog.py)
+CATALOG_FILE = os.environ.get("CATALOG_FILE", "software_products.json")
+
+# Scrape cache (JSON lines keyed by website URL)
+SCRAPE_CACHE_FILE = os.environ.get("SCRAPE_CACHE_FILE", "scrape_cache.jsonl")
+SCRAPE_CACHE_TTL_HOURS = float(os.environ.get("SCRAPE_CACHE_TTL_HOURS", "24"))
+SCRAPE_CACHE_MAX_ENTRIES = int(os.environ.get("SCRAPE_CACHE_MAX_ENTRIES", "500"))
+
+# Per-domain record of which extraction strategy worked (see extraction_profiles.py)
+EXTRACTION_PROFILES_FILE = os.environ.get("EXTRACTION_PROFILES_FILE", "extraction_profiles.json")
+
+# Streaming pipeline: "ordered" posts in selection order, "as_completed" posts
+# each product as soon as it's scraped. The queue bounds how far scraping may
+# run ahead of posting.
+POST_ORDERING = os.environ.get("POST_ORDERING", "ordered")
+PIPELINE_QUEUE_SIZE = int(os.environ.get("PIPELINE_QUEUE_SIZE", "4"))
+
+# Photo posts: image URLs are checked (type, size) before sendPhoto, and the
+# file_id Telegram returns is reused on later posts of the same image.
+IMAGE_FILE_IDS_FILE = os.environ.get("IMAGE_FILE_IDS_FILE", "telegram_file_ids.json")
+IMAGE_CHECK_CONCURRENCY = int(os.environ.get("IMAGE_CHECK_CONCURRENCY", "8"))
+IMAGE_MAX_URL_BYTES = int(os.environ.get("IMAGE_MAX_URL_BYTES", str(5 * 1024 * 1024)))  # Telegram's limit for photo URLs
+# "1" downloads images, downscales them into IMAGE_CACHE_DIR as JPEG and uploads them (needs Pillow)
+IMAGE_DOWNSCALE = os.environ.get("IMAGE_DOWNSCALE", "0") == "1"
+IMAGE_CACHE_DIR = os.environ.get("IMAGE_CACHE_DIR", "image_cache")
+IMAGE_MAX_DIMENSION = int(os.environ.get("IMAGE_MAX_DIMENSION", "1280"))
+
+# Weighted selection (see selection.py). Weights drop to near 0 for a product posted
+# today and recover with this half-life. SELECTION_SEED makes the pick reproducible.
+RECENCY_HALF_LIFE_DAYS = float(os.environ.get("RECENCY_HALF_LIFE_DAYS", "7"))
+SELECTION_SEED = os.environ.get("SELECTION_SEED") or None
+
+# Catalog health check (python main.py health): link and image status per product.
+# Selection skips a product once HEALTH_SKIP_AFTER checks in a row found it dead, unless
+# more than HEALTH_MAX_SKIP_SHARE of the catalog is marked dead (more likely our outage).
+HEALTH_INDEX_FILE = os.environ.get("HEALTH_INDEX_FILE", "health_index.json")
+HEALTH_CHECK_CONCURRENCY = int(os.environ.get("HEALTH_CHECK_CONCURRENCY", "32"))
+HEALTH_CHECK_TIMEOUT = int(os.environ.get("HEALTH_CHECK_TIMEOUT", "10"))
+HEALTH_SKIP_AFTER = int(os.environ.get("HEALTH_SKIP_AFTER", "2"))
+HEALTH_MAX_SKIP_SHARE = float(os.environ.get("HEALTH_MAX_SKIP_SHARE", "0.5"))
+
+# Posting history store: append-only log compacted into per-month snapshots
+HISTORY_DIR = os.environ.get("HISTORY_DIR", "post_history")
+HISTORY_COMPACT_AFTER = int(os.environ.get("HISTORY_COMPACT_AFTER", "7"))  # log lines
+HISTORY_RETENTION_MONTHS = int(os.environ.get("HISTORY_RETENTION_MONTHS", "12"))
+
+# Checkpoints of today's run (selected / scraped / posted), so a crashed run can resume
+RUN_JOURNAL_FILE = os.environ.get("RUN_JOURNAL_FILE", "run_journal.json")
+
+# Machine-readable run reports (one JSON line per run)
+REPORT_FILE = os.environ.get("REPORT_FILE", os.path.join("reports", "run_reports.jsonl"))
@@ -0,0 +1,397 @@
+# dom_extract.py
+#
+# The extraction engine shared by main.py and scraper.py.
+#
+# Image, description and offer strategies are registered with a priority.
+# Each strategy may contribute a small JS collector; all collectors needed
+# for a page are stitched into ONE page.evaluate() call, which walks them in
+# priority order and stops early once a "final" (high-confidence) strategy
+# found something. Python then resolves each field from the collected
+# candidates (filtering, URL resolution). Adding a strategy adds a
+# collector to that single pass, never another page scan.
+
+import json
+import re
+from functools import lru_cache
+from urllib.parse import urljoin, urlparse
+
+import time
+
+from config import PAGE_READY_TIMEOUT_MS
+from offer_text import OFFER_KEYWORDS, rank_offers, js_pattern
+from extraction_profiles import LEARNED_FIELDS, learned, remember, confirm, forget
+from instrumentation import timer, count, annotate
+from utils import setup_logger, wait_for_page_ready
+
+logger = setup_logger()
+
+FIELDS = ("image", "description", "offers")
+
+# Order matters: the first selector with a usable image wins.
+PRIORITIZED_IMAGE_SELECTORS = [
+    'img.logo',
+    'img[alt*="logo" i]',
+    'img[src*="logo"]',
+    'img[alt*="brand" i]',
+    'img[src*="brand"]',
+    'img[alt*="main" i]',
+    'img[src*="main"]',
+    'img[alt*="product" i]',
+    'img[src*="product"]',
+    'img[alt*="trusted" i]',
+    'img[src*="trusted"]',
+    'img[alt*="laplink" i]',
+    'img[src*="laplink"]',
+]
+
+IMAGE_EXTENSIONS = ('.svg', '.png', '.jpg', '.jpeg', '.webp')
+
+STRATEGIES = {field: [] for field in FIELDS}
+
+
+def register(field, name, priority, js=None, final=False):
+    """
+    Registers resolve(candidates, url) -> value-or-None as a strategy for `field`.
+
+    js:    JS arrow function `(ctx) => candidates` run in the page, with
+           ctx = {keywords, selectors}. None for strategies that need no DOM.
+    final: a non-empty result from this collector is trusted as-is, so
+           lower-priority collectors for the field are skipped.
+    """
+    def decorator(resolve):
+        STRATEGIES[field].append({"name": name, "priority": priority, "js": js, "final": final, "resolve": resolve})
+        STRATEGIES[field].sort(key=lambda s: s["priority"])
+        return resolve
+    return decorator
+
+
+# --- Shared helpers ---
+
+def looks_valid_img(src):
+    if not src or src.strip() == "":
+        return False
+    # Exclude sprites, icons, favicons, 1x1, pixels, blanks, spacers
+    return not re.search(r"(sprite|icon|favicon|1x1|pixel|blank|spacer)", src, re.I)
+
+
+def absolutize(url, src):
+    return src if src.startswith('http') else urljoin(url, src)
+
+
+def filter_offers(texts, limit=8):
+    """
+    The best `limit` offers among the candidate texts (see offer_text.rank_offers).
+    """
+    return rank_offers(texts, limit=limit)
+
+
+# --- Image strategies (the old scraper.py fallback chain, in order) ---
+
+@register("image", "og_image", 10, "(ctx) => { const el = document.querySelector('meta[property=\"og:image\"]'); "
+          "return el ? el.getAttribute('content') : null; }", final=True)
+def og_image(candidate, url):
+    return absolutize(url, candidate) if candidate else None
+
+
+@register("image", "twitter_image", 20, "(ctx) => { const el = document.querySelector('meta[name=\"twitter:image\"]'); "
+          "return el ? el.getAttribute('content') : null; }", final=True)
+def twitter_image(candidate, url):
+    return absolutize(url, candidate) if candidate else None
+
+
+@register("image", "first_imgs", 30, """(ctx) => {
+    const header = document.querySelectorAll('header img, nav img');
+    return Array.from(header.length ? header : document.querySelectorAll('img')).slice(0, 8)
+        .map(e => e.getAttribute('src')).filter(Boolean);
+}""")
+def first_imgs(candidates, url):
+    # <img> in header/nav or first N images (SVG/PNG/JPG/WebP ok, even size=0)
+    for src in candidates or []:
+        src = absolutize(url, src)
+        if looks_valid_img(src) and src.lower().endswith(IMAGE_EXTENSIONS):
+            return src
+    return None
+
+
+@register("image", "prioritized", 40, """(ctx) => ctx.selectors.map(sel => {
+    try { return Array.from(document.querySelectorAll(sel)).map(e => e.getAttribute('src')).filter(Boolean); }
+    catch (e) { return []; }
+})""")
+def prioritized(candidates, url):
+    # Smart selectors for common product/brand/hero image patterns
+    for srcs in candidates or []:
+        for src in srcs:
+            if looks_valid_img(src):
+                return absolutize(url, src)
+    return None
+
+
+@register("image", "backgrounds", 50, """(ctx) => Array.from(document.querySelectorAll('[style*="background"]'))
+    .map(e => e.getAttribute('style') || '').filter(s => s.toLowerCase().includes('url('))""")
+def backgrounds(candidates, url):
+    # CSS background-image from inline style
+    for style in candidates or []:
+        match = re.search(r'background(-image)?\s*:\s*url\([\'"]?([^)\'"]+)', style, re.I)
+        if match:
+            css_img = absolutize(url, match.group(2))
+            if looks_valid_img(css_img):
+                return css_img
+    return None
+
+
+@register("image", "favicon", 60, "(ctx) => { const el = document.querySelector('link[rel=\"icon\"], link[rel=\"shortcut icon\"]'); "
+          "return el ? el.getAttribute('href') : null; }")
+def favicon(candidate, url):
+    if candidate:
+        relimg = urljoin(url, candidate)
+        if looks_valid_img(relimg):
+            return relimg
+    return None
+
+
+@register("image", "largest_imgs", 70, """(ctx) => {
+    // Mirrors ElementHandle.bounding_box(): elements that aren't rendered have no box
+    const found = [];
+    for (const img of document.querySelectorAll('img')) {
+        const src = img.getAttribute('src');
+        if (!src || !img.getClientRects().length) continue;
+        const r = img.getBoundingClientRect();
+        const area = (r.width || 1) * (r.height || 1);
+        if (area > 2500) found.push([src, area]);
+    }
+    return found;
+}""")
+def largest_imgs(candidates, url):
+    # Largest visible <img> as last content fallback
+    best_img, max_area = None, 0
+    for src, area in candidates or []:
+        if looks_valid_img(src) and area > max_area:
+            best_img, max_area = src, area
+    return absolutize(url, best_img) if best_img else None
+
+
+@register("image", "avatar", 80)
+def avatar(_, url):
+    # Dynamic fallback: text-initials avatar for the domain
+    domain = urlparse(url).netloc.replace("www.", "")
+    return f"https://ui-avatars.com/api/?name={domain}&background=random"
+
+
+# --- Description and offer strategies ---
+
+@register("description", "description", 10, "(ctx) => { const el = document.querySelector('meta[name=\"description\"]'); "
+          "return el ? el.getAttribute('content') : null; }", final=True)
+def meta_description(candidate, url):
+    return candidate or None
+
+
+@register("description", "first_p", 20, "(ctx) => { const el = document.querySelector('p'); return el ? el.innerText : null; }")
+def first_p(candidate, url):
+    return candidate or None
+
+
+@register("offers", "offer_texts", 10, """(ctx) => {
+    // One compiled alternation per page; exact repeats never leave the browser
+    const keywords = new RegExp(ctx.pattern, 'i');
+    const seen = new Set();
+    for (const el of document.querySelectorAll('li, p')) {
+        const text = (el.innerText || '').trim();
+        if (text && !seen.has(text) && keywords.test(text)) seen.add(text);
+    }
+    return [...seen];
+}""")
+def offer_texts(candidates, url):
+    return filter_offers(candidates or []) or None
+
+
+# --- Engine ---
+
+def build_plan(overrides=None, exclude=()):
+    """
+    Strategies to run per field, in order. `overrides` (a product's
+    "extraction" entry, e.g. {"image": ["favicon", "og_image"]}) moves the
+    named strategies to the front; `exclude` drops strategies by name.
+    """
+    overrides = overrides or {}
+    plan = {}
+    for field in FIELDS:
+        preferred = overrides.get(field, [])
+        steps = [s for s in STRATEGIES[field] if s["name"] not in exclude]
+        steps.sort(key=lambda s: (preferred.index(s["name"]) if s["name"] in preferred else len(preferred), s["priority"]))
+        plan[field] = steps
+    return plan
+
+
+@lru_cache(maxsize=32)
+def _build_script(collectors):
+    """
+    collectors: tuple of (field, ((name, js, final), ...)) in run order.
+    """
+    functions = ",\n".join(
+        f"{json.dumps(name)}: {js}" for _, steps in collectors for name, js, _ in steps
+    )
+    order = json.dumps([[field, [[name, final] for name, _, final in steps]] for field, steps in collectors])
+    return f"""(ctx) => {{
+    const collectors = {{
+{functions}
+    }};
+    const out = {{}};
+    for (const [field, steps] of {order}) {{
+        for (const [name, final] of steps) {{
+            let value = null;
+            try {{ value = collectors[name](ctx); }} catch (e) {{}}
+            out[name] = value;
+            if (final && value && (!Array.isArray(value) || value.length)) break;
+        }}
+    }}
+    return out;
+}}"""
+
+
+async def collect_candidates(page, plan, keywords=OFFER_KEYWORDS, selectors=PRIORITIZED_IMAGE_SELECTORS):
+    """
+    Runs every collector in the plan in a single page.evaluate() and returns
+    {strategy name: candidates} for the collectors that ran.
+    """
+    collectors = tuple(
+        (field, tuple((s["name"], s["js"], s["final"]) for s in steps if s["js"]))
+        for field, steps in plan.items()
+    )
+    count("round_trips")
+    return await page.evaluate(_build_script(collectors), {
+        "pattern": js_pattern(keywords),
+        "selectors": list(selectors),
+    })
+
+
+def resolve_field(field, plan, collected, url):
+    """
+    Returns (strategy name, value) from the first strategy in the plan that
+    resolves to something. Collectors that didn't run (early exit, or a
+    source like the HTTP tier that can't provide them) are skipped.
+    """
+    for strategy in plan[field]:
+        if strategy["js"] and strategy["name"] not in collected:
+            continue
+        value = strategy["resolve"](collected.get(strategy["name"]), url)
+        if value:
+            return strategy["name"], value
+    return None, None
+
+
+def resolve_fields(plan, collected, url):
+    """
+    {field: (strategy name, value)} for every field in the plan.
+    """
+    return {field: resolve_field(field, plan, collected, url) for field in plan}
+
+
+def as_result(winners):
+    """
+    (offers, image, desc) from resolve_fields(); records the winning image strategy.
+    """
+    annotate(image_step=winners["image"][0])
+    return winners["offers"][1] or [], winners["image"][1], winners["description"][1] or ""
+
+
+def resolve_all(plan, collected, url):
+    return as_result(resolve_fields(plan, collected, url))
+
+
+def learned_plan(profiles, url, overrides=None, exclude=()):
+    """
+    A plan that runs only the learned strategy for each learned field (the
+    steps before it are known to fail for this domain), plus the selector
+    list to use. Returns (None, None) when nothing usable is learned.
+    """
+    plan = build_plan(overrides, exclude)
+    selectors = PRIORITIZED_IMAGE_SELECTORS
+    used = False
+    for field in LEARNED_FIELDS:
+        profile = learned(profiles, url, field)
+        if not profile or (overrides or {}).get(field):
+            continue
+        steps = [s for s in plan[field] if s["name"] == profile["strategy"]]
+        if not steps:
+            continue  # strategy excluded here, or no longer registered
+        plan[field] = steps
+        if profile.get("selector") in PRIORITIZED_IMAGE_SELECTORS:
+            selectors = [profile["selector"]]
+        used = True
+    return (plan, selectors) if used else (None, None)
+
+
+def learn(profiles, url, plan, collected, winners, ms):
+    """
+    Remembers the winning image/description strategy for the domain, with
+    the steps that ran before it and came up empty.
+    """
+    for field in LEARNED_FIELDS:
+        name, value = winners[field]
+        if not value or name == "avatar":
+            continue  # the placeholder isn't worth pinning - keep looking for a real image
+        failed = []
+        for strategy in plan[field]:
+            if strategy["name"] == name:
+                break
+            if strategy["name"] in collected:
+                failed.append(strategy["name"])
+        selector = None
+        if name == "prioritized":
+            selector = next(
+                (sel for sel, srcs in zip(PRIORITIZED_IMAGE_SELECTORS, collected["prioritized"] or [])
+                 if any(looks_valid_img(src) for src in srcs)),
+                None,
+            )
+        profile = learned(profiles, url, field)
+        if not (profile and profile["strategy"] == name and profile.get("selector") == selector):
+            remember(profiles, url, field, name, selector, failed, ms)
+
+
+async def extract_offers_and_image(page, url, max_wait_ms=None, overrides=None, exclude=(), goto_timeout=30000,
+                                   profiles=None):
+    """
+    Loads url and extracts (offers, image, desc) with the strategy engine.
+    With a `profiles` dict (see extraction_profiles), the domain's learned
+    strategies run alone first; if one comes up empty it is forgotten and
+    the full plan runs. Errors are logged and give empty results, so one bad
+    site can't stop a run.
+    """
+    offers, image, desc = [], None, ""
+    try:
+        with timer("ready"):
+            await wait_for_page_ready(page, url, goto_timeout=goto_timeout, max_wait_ms=max_wait_ms or PAGE_READY_TIMEOUT_MS)
+
+        winners = None
+        plan, selectors = learned_plan(profiles, url, overrides, exclude) if profiles is not None else (None, None)
+        if plan:
+            start = time.perf_counter()
+            with timer("extract", profile=True):
+                collected = await collect_candidates(page, plan, selectors=selectors)
+            winners = resolve_fields(plan, collected, url)
+            ms = (time.perf_counter() - start) * 1000
+            stale = [f for f in LEARNED_FIELDS if learned(profiles, url, f) and not winners[f][1]]
+            for field in LEARNED_FIELDS:
+                if field in stale:
+                    forget(profiles, url, field)
+                else:
+                    confirm(profiles, url, field, ms)
+            if stale:
+                count("profile_misses")
+                winners = None  # fall through to the full plan
+            else:
+                count("profile_hits")
+
+        if winners is None:
+            plan = build_plan(overrides, exclude)
+            start = time.perf_counter()
+            with timer("extract"):
+                collected = await collect_candidates(page, plan)
+            winners = resolve_fields(plan, collected, url)
+            if profiles is not None:
+                learn(profiles, url, plan, collected, winners, (time.perf_counter() - start) * 1000)
+
+        offers, image, desc = as_result(winners)
+    except Exception as e:
+        logger.error(f"❌ Error scraping {url}: {e}")
+    return offers, image, desc
@@ -0,0 +1,58 @@
+# extraction_profiles.py
+#
+# Per-domain memory of which extraction strategy worked, e.g.
+#
+#   {"mindmanager.com": {"image": {"strategy": "prioritized", "selector": "img.logo",
+#                                  "failed": ["og_image", "twitter_image", "first_imgs"],
+#                                  "ms": 41.2, "hits": 6, "learned_at": "2026-10-17"}}}
+#
+# dom_extract uses it to run only the learned strategy on later visits, and
+# forgets the entry as soon as that strategy stops producing a result.
+
+from datetime import date
+from urllib.parse import urlparse
+
+from config import EXTRACTION_PROFILES_FILE
+from utils import load_json, write_json_atomic
+
+LEARNED_FIELDS = ("image", "description")
+
+
+def load_profiles(path=EXTRACTION_PROFILES_FILE):
+    return load_json(path)  # a corrupt profile file just means re-learning
+
+
+def save_profiles(profiles, path=EXTRACTION_PROFILES_FILE):
+    write_json_atomic(path, profiles)
+
+
+def domain_of(url):
+    return (urlparse(url).hostname or "").removeprefix("www.")
+
+
+def learned(profiles, url, field):
+    return profiles.get(domain_of(url), {}).get(field)
+
+
+def remember(profiles, url, field, strategy, selector=None, failed=(), ms=None):
+    profile = {"strategy": strategy, "failed": list(failed), "hits": 0, "learned_at": date.today().isoformat()}
+    if selector:
+        profile["selector"] = selector
+    if ms is not None:
+        profile["ms"] = round(ms, 1)
+    profiles.setdefault(domain_of(url), {})[field] = profile
+
+
+def confirm(profiles, url, field, ms=None):
+    profile = learned(profiles, url, field)
+    if profile:
+        profile["hits"] = profile.get("hits", 0) + 1
+        if ms is not None:
+            profile["ms"] = round(ms, 1)
+
+
+def forget(profiles, url, field):
+    domain = domain_of(url)
+    profiles.get(domain, {}).pop(field, None)
+    if domain in profiles and not profiles[domain]:
+        del profiles[domain]
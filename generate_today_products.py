@@ -1,7 +1,13 @@
 import json
 import random
+import hashlib
 from datetime import datetime
 import os
+from catalog import iter_products
+from config import CATALOG_FILE, SELECTION_SEED
+from healthcheck import unhealthy_names
+from history_store import load_month, record_posted, reset_month, compact_if_needed
+from selection import weighted_sample, make_weight, load_last_posted
 
 # Map weekdays to themes/categories
 WEEKDAY_CATEGORY_MAP = {
@@ -29,31 +35,14 @@ NUM_PRODUCTS_PER_DAY = {
     "mixed": (5, 8)
 }
 
-PRODUCTS_FILE = "software_products.json"
-HISTORY_FILE = "post_history.json"
+PRODUCTS_FILE = CATALOG_FILE
 OUTPUT_FILE = "software_affiliates.json"
-
-def load_all_products():
-    with open(PRODUCTS_FILE, "r", encoding="utf-8") as f:
-        return json.load(f)
+INDEX_FILE = os.path.splitext(PRODUCTS_FILE)[0] + ".index.json"
 
 def save_today_products(products):
     with open(OUTPUT_FILE, "w", encoding="utf-8") as f:
         json.dump(products, f, indent=2, ensure_ascii=False)
 
-def load_history(month_key):
-    if os.path.exists(HISTORY_FILE):
-        with open(HISTORY_FILE, "r", encoding="utf-8") as f:
-            history = json.load(f)
-    else:
-        history = {}
-    posted_names = set(history.get(month_key, []))
-    return history, posted_names
-
-def save_history(history):
-    with open(HISTORY_FILE, "w", encoding="utf-8") as f:
-        json.dump(history, f, indent=2)
-
 def match_category(product, keywords):
     name = product.get("name", "").lower()
     desc = product.get("desc", "").lower()
@@ -65,45 +54,146 @@ def match_category(product, keywords):
         any(kw in tag for kw in keywords) for tag in tags
     )
 
-def generate_today_products():
-    all_products = load_all_products()
-    weekday = datetime.now().weekday()
-    category = WEEKDAY_CATEGORY_MAP[weekday]
+def keywords_signature():
+    return hashlib.sha256(json.dumps(CATEGORY_KEYWORDS, sort_keys=True).encode()).hexdigest()
+
+def file_signature(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def build_category_index(products):
+    """
+    Inverted index from each category keyword to the names of the products
+    it matches (same rule as match_category), plus the catalog order.
+    """
+    all_keywords = sorted({kw for kws in CATEGORY_KEYWORDS.values() for kw in kws})
+    keyword_index = {kw: [] for kw in all_keywords}
+    order = []
+    for product in products:
+        order.append(product["name"])
+        # Lowercase each product once, then test every keyword against it.
+        # Tags are NUL-separated so a keyword can't match across two of them.
+        text = "\x00".join(
+            [f"{product.get('name', '')} {product.get('desc', '')} {product.get('website', '')}"]
+            + product.get("tags", [])
+        ).lower()
+        for kw in all_keywords:
+            if kw in text:
+                keyword_index[kw].append(product["name"])
+    return {"order": order, "keywords": keyword_index}
+
+def load_category_index(products=None, catalog_path=PRODUCTS_FILE, index_path=INDEX_FILE):
+    """
+    Loads the persisted category index, rebuilding it only when the catalog
+    (checked by mtime, then content hash) or CATEGORY_KEYWORDS changed.
+    """
+    catalog_mtime = os.path.getmtime(catalog_path)
+    index = None
+    if os.path.exists(index_path):
+        with open(index_path, "r", encoding="utf-8") as f:
+            index = json.load(f)
+        if index.get("keywords_signature") != keywords_signature():
+            index = None
+        elif index.get("catalog_mtime") != catalog_mtime:
+            # Touched but maybe not changed (e.g. a fresh git checkout)
+            if index.get("catalog_signature") == file_signature(catalog_path):
+                index["catalog_mtime"] = catalog_mtime
+                save_category_index(index, index_path)
+            else:
+                index = None
+    if index is not None:
+        return index
+
+    index = build_category_index(products if products is not None else iter_products(catalog_path))
+    index.update({
+        "catalog_mtime": catalog_mtime,
+        "catalog_signature": file_signature(catalog_path),
+        "keywords_signature": keywords_signature(),
+    })
+    save_category_index(index, index_path)
+    return index
+
+def save_category_index(index, index_path=INDEX_FILE):
+    with open(index_path, "w", encoding="utf-8") as f:
+        json.dump(index, f, ensure_ascii=False, separators=(",", ":"))
+
+def category_names(index, category):
+    """
+    Names of the products in a category; "mixed" (no keywords) is the whole catalog.
+    """
     keywords = CATEGORY_KEYWORDS.get(category, [])
-    month_key = datetime.now().strftime("%Y-%m")
+    if not keywords:
+        return set(index["order"])
+    names = set()
+    for kw in keywords:
+        names.update(index["keywords"].get(kw, []))
+    return names
+
+def generate_today_products(seed=SELECTION_SEED, now=None):
+    """
+    Picks today's products (weighted by selection.make_weight) into
+    software_affiliates.json and appends them to the posting history.
+    The same seed and date give the same pick.
+    """
+    now = now or datetime.now()
+    # Seeded by date too, so a fixed seed still varies from day to day
+    rng = random.Random(f"{seed}:{now.date()}") if seed is not None else random.Random()
+    weekday = now.weekday()
+    category = WEEKDAY_CATEGORY_MAP[weekday]
+    month_key = now.strftime("%Y-%m")
 
-    history, posted_names = load_history(month_key)
+    posted_names = set(load_month(month_key))
+    index = load_category_index(catalog_path=PRODUCTS_FILE)
+    in_category = category_names(index, category)
 
     # 1. Filter per category (and not posted yet this month)
-    if category == "mixed":
-        eligible = [p for p in all_products if p["name"] not in posted_names]
-    else:
-        eligible = [p for p in all_products if match_category(p, keywords) and p["name"] not in posted_names]
-        if not eligible:
-            print(f"No products matched category '{category}' or all already posted this month. Falling back to mixed.")
-            eligible = [p for p in all_products if p["name"] not in posted_names]
+    eligible_names = in_category - posted_names
+    if not eligible_names and category != "mixed":
+        print(f"No products matched category '{category}' or all already posted this month. Falling back to mixed.")
+        eligible_names = set(index["order"]) - posted_names
 
     # 2. If STILL none left, reset month's history (begin new rotation), select from all/category as usual:
-    if not eligible:
-        posted_names = set()
-        if category == "mixed":
-            eligible = all_products
-        else:
-            eligible = [p for p in all_products if match_category(p, keywords)]
-            if not eligible:  # fallback again to all
-                eligible = all_products
+    reset = not eligible_names
+    if reset:
+        eligible_names = in_category or set(index["order"])
 
+    # 3. Leave out products the health check keeps finding dead, unless too few
+    # would be left to post; then the index is more likely wrong than the catalog
     min_count, max_count = NUM_PRODUCTS_PER_DAY.get(category, NUM_PRODUCTS_PER_DAY["default"])
-    todays_count = min(len(eligible), random.randint(min_count, max_count))
-    selected = random.sample(eligible, todays_count)
+    healthy = eligible_names - unhealthy_names()
+    if len(healthy) >= min(min_count, len(eligible_names)):
+        eligible_names = healthy
+    else:
+        print(f"Only {len(healthy)} eligible products look healthy; ignoring the health index today.")
+
+    # One streaming pass over the catalog, holding only the sampled products.
+    # Weights favour products not posted lately (across months).
+    todays_count = min(len(eligible_names), rng.randint(min_count, max_count))
+    weight = make_weight(load_last_posted(now.date()), now.date())
+    eligible = (p for p in iter_products(PRODUCTS_FILE) if p["name"] in eligible_names)
+    selected = weighted_sample(eligible, todays_count, weight, rng)
 
     save_today_products(selected)
     print(f"✅ Selected {len(selected)} '{category}' products for posting today.")
 
-    # 3. Update and save the posted history
-    posted_today = {p["name"] for p in selected}
-    history[month_key] = list(posted_names | posted_today)
-    save_history(history)
+    # 4. Append today's picks to the posted history
+    if reset:
+        reset_month(month_key, now.date().isoformat())
+    record_posted(month_key, {p["name"] for p in selected}, now.date().isoformat())
+    compact_if_needed()
+
+def ensure_recorded(selected):
+    """
+    Re-appends a selection to the posting history if it isn't there, e.g.
+    when the run that selected it crashed before its history was saved.
+    """
+    month_key = datetime.now().strftime("%Y-%m")
+    missing = {p["name"] for p in selected} - set(load_month(month_key))
+    if missing:
+        record_posted(month_key, missing)
 
 if __name__ == "__main__":
     generate_today_products()
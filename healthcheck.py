@@ -0,0 +1,250 @@
+# healthcheck.py
+#
+# Validates every catalog entry without a browser: the affiliate link is
+# followed through its redirects (linksredirect.com and the like, including
+# a meta refresh) to the landing page, the website is fetched, and the
+# product image (or the page's og:image) is checked like image_pipeline
+# does before a post. Checks run concurrently on the pooled HTTP session
+# under a concurrency cap, and the result is a compact status index:
+#
+#   {name: {"ok": true, "failures": 0, "checked_at": "...", "website": 200,
+#           "landing": 200, "landing_url": "...", "image": "ok"}}
+#
+# A product is skipped by selection once HEALTH_SKIP_AFTER checks in a row
+# found its website or landing page dead, i.e. answering with an error
+# status. A request that got no answer at all (DNS, connect, timeout) may
+# be the runner's own network, so it neither counts as a failure nor
+# resets the streak; the record's "ok" is null then.
+#
+# Usage: python main.py health [--concurrency 32] [--max-age-hours 0]
+
+import argparse
+import asyncio
+import codecs
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from html import unescape
+from urllib.parse import urljoin
+
+from config import (
+    CATALOG_FILE, HEALTH_INDEX_FILE, HEALTH_CHECK_CONCURRENCY, HEALTH_CHECK_TIMEOUT, HEALTH_SKIP_AFTER,
+    HEALTH_MAX_SKIP_SHARE,
+)
+from http_extract import LandingPageParser, page_encoding
+from image_pipeline import check_image, usable_by_url, describe
+from instrumentation import timer, count, write_report
+from utils import get_http_session, setup_logger, load_json, write_json_atomic
+
+logger = setup_logger()
+
+HEAD_BYTES = 256 * 1024  # og:image and meta refresh live in <head>
+MAX_META_REFRESHES = 3
+# Bot protection answers these to scripts; the site itself is up
+BLOCKED_STATUSES = (401, 403, 429)
+META_REFRESH = re.compile(
+    r"""<meta[^>]+http-equiv=["']?refresh["']?[^>]+content=["']?\s*\d*\s*;?\s*url\s*=\s*['"]?([^"'>\s]+)""", re.I
+)
+
+
+def load_index(path=HEALTH_INDEX_FILE):
+    return load_json(path)
+
+
+def save_index(index, path=HEALTH_INDEX_FILE):
+    write_json_atomic(path, index, indent=None, separators=(",", ":"))
+
+
+def unhealthy_names(index=None, skip_after=HEALTH_SKIP_AFTER, max_share=HEALTH_MAX_SKIP_SHARE):
+    """
+    Names selection should skip: dead in the last `skip_after` checks. An
+    empty set if more than `max_share` of the index is, which points at the
+    checker rather than the catalog.
+    """
+    index = load_index() if index is None else index
+    names = {name for name, record in index.items() if record["ok"] is False and record["failures"] >= skip_after}
+    if index and len(names) > max_share * len(index):
+        logger.warning(f"⚠️ {len(names)} of {len(index)} products marked dead; ignoring the health index")
+        return set()
+    return names
+
+
+def alive(status):
+    return status < 400 or status in BLOCKED_STATUSES
+
+
+def fetch_page(session, url, timeout=HEALTH_CHECK_TIMEOUT):
+    """
+    GETs url following HTTP redirects and meta refreshes, reading only the
+    head of HTML pages. Returns {"status", "url", "og_image", "error"}.
+    """
+    try:
+        for _ in range(MAX_META_REFRESHES + 1):
+            with session.get(url, timeout=timeout, stream=True, allow_redirects=True) as response:
+                url = response.url
+                head = ""
+                if "html" in response.headers.get("Content-Type", "html"):
+                    decoder = None
+                    read = 0
+                    for chunk in response.iter_content(chunk_size=16 * 1024):
+                        if decoder is None:
+                            decoder = codecs.getincrementaldecoder(page_encoding(response, chunk))(errors="replace")
+                        head += decoder.decode(chunk)
+                        read += len(chunk)
+                        if read >= HEAD_BYTES or "</head>" in head.lower():
+                            break
+                    count("bytes_received", read)
+            refresh = META_REFRESH.search(head) if response.ok else None
+            if not refresh:
+                break
+            url = urljoin(url, unescape(refresh.group(1)))
+    except Exception as e:
+        return {"status": None, "url": url, "og_image": None, "error": str(e)}
+    parser = LandingPageParser()
+    parser.feed(head)
+    og_image = parser.meta.get("og:image") or parser.meta.get("twitter:image")
+    return {
+        "status": response.status_code, "url": url,
+        "og_image": urljoin(url, og_image) if og_image else None, "error": None,
+    }
+
+
+def same_page(a, b):
+    return a.split("#")[0].split("?")[0].rstrip("/") == b.split("#")[0].split("?")[0].rstrip("/")
+
+
+def check_product(session, product, timeout=HEALTH_CHECK_TIMEOUT):
+    """
+    One product's health record (without the failure streak).
+    """
+    record = {"checked_at": datetime.now().isoformat(timespec="seconds")}
+    errors = []
+    pages = []
+
+    affiliate = product.get("affiliate_link")
+    if affiliate:
+        landing = fetch_page(session, affiliate, timeout)
+        record["landing"] = landing["status"]
+        record["landing_url"] = landing["url"]
+        errors.append(landing["error"])
+        pages.append(landing)
+    website = product.get("website")
+    if website:
+        if pages and pages[0]["status"] and alive(pages[0]["status"]) and same_page(pages[0]["url"], website):
+            site = pages[0]  # the affiliate link lands on the website itself
+        else:
+            site = fetch_page(session, website, timeout)
+            errors.append(site["error"])
+        record["website"] = site["status"]
+        pages.insert(0, site)
+
+    image = product.get("image") or next((page["og_image"] for page in pages if page["og_image"]), None)
+    if not image:
+        record["image"] = "missing"
+    else:
+        check = check_image(session, image, timeout)
+        record["image"] = "ok" if usable_by_url(check) else describe(check)
+
+    statuses = [page["status"] for page in pages]
+    if any(status is not None and not alive(status) for status in statuses):
+        record["ok"] = False
+    elif None in statuses:
+        record["ok"] = None  # no answer: can't tell a dead site from our own network
+    else:
+        record["ok"] = bool(pages)
+    error = next((e for e in errors if e), None)
+    if error and not record["ok"]:
+        record["error"] = error[:200]
+    return record
+
+
+async def check_catalog(products, index, concurrency=HEALTH_CHECK_CONCURRENCY, timeout=HEALTH_CHECK_TIMEOUT):
+    """
+    Checks products concurrently and updates index in place. Returns the
+    new records in completion order.
+    """
+    session = get_http_session(pool_size=concurrency)
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    loop = asyncio.get_running_loop()
+    results = []
+
+    async def check(product, executor):
+        name = product.get("name", "")
+        async with semaphore:
+            record = await loop.run_in_executor(executor, check_product, session, product, timeout)
+        previous = index.get(name, {})
+        if record["ok"] is None:
+            record["failures"] = previous.get("failures", 0)
+        else:
+            record["failures"] = 0 if record["ok"] else previous.get("failures", 0) + 1
+        index[name] = record
+        results.append(record)
+        count({True: "health_ok", False: "health_dead", None: "health_unreachable"}[record["ok"]])
+        if record.get("image", "ok") != "ok":
+            count("health_image_broken")
+        if record["ok"] is None:
+            logger.warning(f"🔌 {name}: no answer ({record.get('error')}), not counted")
+        elif not record["ok"]:
+            logger.warning(f"💀 {name}: website {record.get('website')}, landing {record.get('landing')}"
+                           f"{' (' + record['error'] + ')' if record.get('error') else ''}")
+
+    # Blocking requests calls need one thread per concurrent check
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as executor:
+        await asyncio.gather(*(check(product, executor) for product in products))
+    return results
+
+
+def stale(record, max_age_hours, now=None):
+    if not record or record["ok"] is None or max_age_hours <= 0:  # retry unanswered checks
+        return True
+    now = now or datetime.now()
+    return now - datetime.fromisoformat(record["checked_at"]) >= timedelta(hours=max_age_hours)
+
+
+def run_healthcheck(catalog_path=CATALOG_FILE, index_path=HEALTH_INDEX_FILE, concurrency=HEALTH_CHECK_CONCURRENCY,
+                    timeout=HEALTH_CHECK_TIMEOUT, max_age_hours=0):
+    """
+    Checks the catalog (only entries older than max_age_hours, if set) and
+    saves the index, dropping products no longer in the catalog.
+    """
+    from catalog import iter_products
+
+    index = load_index(index_path)
+    products = list(iter_products(catalog_path))
+    names = {p.get("name", "") for p in products}
+    index = {name: record for name, record in index.items() if name in names}
+    due = [p for p in products if stale(index.get(p.get("name", "")), max_age_hours)]
+
+    logger.info(f"🩺 Checking {len(due)} of {len(products)} products ({concurrency} at a time)")
+    start = time.perf_counter()
+    try:
+        with timer("health", products=len(due)):
+            results = asyncio.run(check_catalog(due, index, concurrency, timeout))
+    finally:
+        save_index(index, index_path)
+    elapsed = time.perf_counter() - start
+    dead = sum(r["ok"] is False for r in results)
+    unreachable = sum(r["ok"] is None for r in results)
+    broken = sum(r.get("image", "ok") != "ok" for r in results)
+    logger.info(f"✅ Checked {len(results)} products in {elapsed:.1f}s ({len(results) / elapsed if elapsed else 0:.1f}/s): "
+                f"{dead} dead, {unreachable} unreachable, {broken} without a usable image, {len(unhealthy_names(index))} skipped by selection")
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check catalog links and images and write the health index.")
+    parser.add_argument("--catalog", default=CATALOG_FILE)
+    parser.add_argument("--index", default=HEALTH_INDEX_FILE)
+    parser.add_argument("--concurrency", type=int, default=HEALTH_CHECK_CONCURRENCY)
+    parser.add_argument("--timeout", type=int, default=HEALTH_CHECK_TIMEOUT, help="Seconds per request")
+    parser.add_argument("--max-age-hours", type=float, default=0,
+                        help="Only re-check entries older than this (0 = check everything)")
+    args = parser.parse_args(argv)
+    run_healthcheck(args.catalog, args.index, args.concurrency, args.timeout, args.max_age_hours)
+    write_report()
+    return 0
+
+
+if __name__ == "__main__":
+    main()
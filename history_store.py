@@ -0,0 +1,142 @@
+# history_store.py
+#
+# Posting history as an append-only daily log plus per-month snapshots.
+#
+#   post_history/log.jsonl    one line per run: {"date", "month", "names"} or a month reset
+#   post_history/YYYY-MM.json {name: last date posted} for that month
+#
+# A run reads one snapshot and the short log, and appends a single line, so
+# its I/O doesn't grow with the length of the history. Every few runs the
+# log is folded into the snapshots and months past the retention window are
+# dropped. The old single-file post_history.json is imported on first use.
+
+import json
+import os
+from datetime import date
+
+from config import HISTORY_DIR, HISTORY_COMPACT_AFTER, HISTORY_RETENTION_MONTHS
+from utils import write_json_atomic
+
+LEGACY_HISTORY_FILE = "post_history.json"
+LOG_NAME = "log.jsonl"
+
+
+def _log_path(history_dir):
+    return os.path.join(history_dir, LOG_NAME)
+
+
+def _snapshot_path(history_dir, month_key):
+    return os.path.join(history_dir, f"{month_key}.json")
+
+
+def _read_log(history_dir):
+    path = _log_path(history_dir)
+    if not os.path.exists(path):
+        return []
+    records = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                try:
+                    records.append(json.loads(line))
+                except json.JSONDecodeError:
+                    continue  # torn last line from an interrupted run
+    return records
+
+
+def _append_log(history_dir, record):
+    os.makedirs(history_dir, exist_ok=True)
+    with open(_log_path(history_dir), "a", encoding="utf-8") as f:
+        f.write(json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n")
+
+
+def load_snapshot(month_key, history_dir=HISTORY_DIR):
+    path = _snapshot_path(history_dir, month_key)
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _apply(snapshot, record):
+    if record.get("reset"):
+        snapshot.clear()
+    for name in record.get("names", []):
+        snapshot[name] = record["date"]
+
+
+def import_legacy_history(legacy_file=LEGACY_HISTORY_FILE, history_dir=HISTORY_DIR):
+    """
+    Converts the old {"YYYY-MM": [names]} post_history.json into month
+    snapshots. Dates weren't recorded, so each name gets the 1st of its month.
+    Does nothing once the store has any data.
+    """
+    if not os.path.exists(legacy_file) or os.path.isdir(history_dir) and os.listdir(history_dir):
+        return False
+    with open(legacy_file, "r", encoding="utf-8") as f:
+        legacy = json.load(f)
+    os.makedirs(history_dir, exist_ok=True)
+    for month_key, names in legacy.items():
+        write_json_atomic(_snapshot_path(history_dir, month_key), {name: f"{month_key}-01" for name in names})
+    return True
+
+
+def load_month(month_key, history_dir=HISTORY_DIR):
+    """
+    Returns {name: last date posted} for the month: its snapshot plus any
+    log lines not compacted yet. Use `name in result` for membership.
+    """
+    import_legacy_history(history_dir=history_dir)
+    snapshot = load_snapshot(month_key, history_dir)
+    for record in _read_log(history_dir):
+        if record.get("month") == month_key:
+            _apply(snapshot, record)
+    return snapshot
+
+
+def record_posted(month_key, names, day=None, history_dir=HISTORY_DIR):
+    day = day or date.today().isoformat()
+    _append_log(history_dir, {"date": day, "month": month_key, "names": sorted(names)})
+
+
+def reset_month(month_key, day=None, history_dir=HISTORY_DIR):
+    """
+    Starts a new rotation: everything posted earlier this month becomes eligible again.
+    """
+    day = day or date.today().isoformat()
+    _append_log(history_dir, {"date": day, "month": month_key, "reset": True})
+
+
+def compact(history_dir=HISTORY_DIR, retention_months=HISTORY_RETENTION_MONTHS, today=None):
+    """
+    Folds the log into the month snapshots, truncates it, and deletes
+    snapshots older than the retention window (0 keeps everything).
+    """
+    records = _read_log(history_dir)
+    snapshots = {}
+    for record in records:
+        month_key = record["month"]
+        if month_key not in snapshots:
+            snapshots[month_key] = load_snapshot(month_key, history_dir)
+        _apply(snapshots[month_key], record)
+    for month_key, snapshot in snapshots.items():
+        write_json_atomic(_snapshot_path(history_dir, month_key), snapshot)
+    if os.path.exists(_log_path(history_dir)):
+        os.remove(_log_path(history_dir))
+
+    if retention_months:
+        today = today or date.today()
+        oldest = today.year * 12 + today.month - 1 - (retention_months - 1)
+        for filename in os.listdir(history_dir):
+            stem, ext = os.path.splitext(filename)
+            if ext != ".json" or len(stem) != 7:
+                continue
+            year, month = stem.split("-")
+            if int(year) * 12 + int(month) - 1 < oldest:
+                os.remove(os.path.join(history_dir, filename))
+
+
+def compact_if_needed(history_dir=HISTORY_DIR, threshold=HISTORY_COMPACT_AFTER):
+    if len(_read_log(history_dir)) >= threshold:
+        compact(history_dir)
@@ -0,0 +1,161 @@
+# http_extract.py
+#
+# First extraction tier: fetch the landing page over plain HTTP and stream it
+# through html.parser. Produces candidates keyed by the same strategy names
+# as dom_extract.collect_candidates() (minus the image fallbacks that need
+# layout), so callers can only launch Chromium when this isn't enough.
+
+import codecs
+import re
+from html.parser import HTMLParser
+
+from offer_text import OFFER_KEYWORDS, compile_terms
+from instrumentation import count
+
+MAX_HTML_BYTES = 2 * 1024 * 1024
+TEXT_TAGS = ("li", "p")
+SKIP_TAGS = ("script", "style", "noscript", "template")
+# Block elements that implicitly close an open <p>
+P_CLOSERS = ("div", "ul", "ol", "table", "section", "article", "header", "footer", "nav",
+             "form", "h1", "h2", "h3", "h4", "h5", "h6", "blockquote", "pre", "hr")
+# <meta charset="..."> or <meta http-equiv="Content-Type" content="...; charset=...">
+META_CHARSET = re.compile(rb"""<meta[^>]+charset\s*=\s*["']?([\w.:-]+)""", re.I)
+
+
+class LandingPageParser(HTMLParser):
+    """
+    Collects head meta tags and the text of every <li>/<p>, as innerText would
+    see it (an <li> containing a <p> yields both texts).
+    """
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.meta = {}
+        self.texts = []
+        self.first_p = None
+        self._open = []  # [tag, [chunks], slot in self.texts, list depth] for each open li/p
+        self._list_depth = 0
+        self._skip_depth = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in SKIP_TAGS:
+            self._skip_depth += 1
+            return
+        if tag == "meta":
+            attrs = dict(attrs)
+            key = (attrs.get("property") or attrs.get("name") or "").lower()
+            if key in ("og:image", "twitter:image", "description") and key not in self.meta:
+                self.meta[key] = attrs.get("content")
+        elif tag in TEXT_TAGS:
+            # <p> closes implicitly when a <p>/<li> opens, <li> only when a sibling
+            # <li> in the same list does (not the first <li> of a nested list)
+            if self._open and self._open[-1][0] == "p":
+                self._close("p")
+            if tag == "li" and self._open and self._open[-1][0] == "li" and self._open[-1][3] == self._list_depth:
+                self._close("li")
+            self.handle_data("\n")  # block boundary inside an enclosing <li>
+            # Reserve the slot now so texts stay in document order, like querySelectorAll
+            self._open.append([tag, [], len(self.texts), self._list_depth])
+            self.texts.append("")
+        elif tag in P_CLOSERS:
+            if self._open and self._open[-1][0] == "p":
+                self._close("p")
+            if tag in ("ul", "ol"):
+                self._list_depth += 1
+        elif tag == "br":
+            self.handle_data("\n")
+
+    def handle_endtag(self, tag):
+        if tag in SKIP_TAGS:
+            self._skip_depth = max(0, self._skip_depth - 1)
+        elif tag in TEXT_TAGS:
+            self._close(tag)
+        elif tag in ("ul", "ol"):
+            # Closing a list closes any <li> still open inside it, not the parent <li>
+            while self._open and self._open[-1][0] == "li" and self._open[-1][3] == self._list_depth:
+                self._close("li")
+            self._list_depth = max(0, self._list_depth - 1)
+
+    def handle_data(self, data):
+        if self._skip_depth:
+            return
+        for _, chunks, _, _ in self._open:
+            chunks.append(data)
+
+    def _close(self, tag):
+        # Close the innermost open tag of this kind (and anything left open inside it)
+        for i in range(len(self._open) - 1, -1, -1):
+            if self._open[i][0] == tag:
+                for open_tag, chunks, slot, _ in self._open[i:]:
+                    text = " ".join("".join(chunks).split())
+                    self.texts[slot] = text
+                    if open_tag == "p" and self.first_p is None:
+                        self.first_p = text
+                del self._open[i:]
+                self.handle_data("\n")
+                return
+
+    def close(self):
+        super().close()
+        while self._open:
+            self._close(self._open[-1][0])
+
+
+def page_encoding(response, first_chunk):
+    """
+    The charset from the Content-Type header, else from a BOM or <meta> in
+    the first chunk, else UTF-8. requests guesses ISO-8859-1 for any text/*
+    response without a charset, which garbles UTF-8 pages, so its guess
+    isn't used.
+    """
+    if "charset=" in response.headers.get("Content-Type", "").lower() and response.encoding:
+        return response.encoding
+    if first_chunk.startswith(codecs.BOM_UTF8):
+        return "utf-8-sig"
+    match = META_CHARSET.search(first_chunk)
+    if match:
+        try:
+            return codecs.lookup(match.group(1).decode("ascii")).name
+        except (LookupError, UnicodeDecodeError):
+            pass
+    return "utf-8"
+
+
+def http_extract(session, url, keywords=OFFER_KEYWORDS, timeout=15, max_bytes=MAX_HTML_BYTES):
+    """
+    Fetches and parses url. Returns candidates like collect_candidates(), or None
+    if the page couldn't be fetched or isn't HTML.
+    """
+    try:
+        with session.get(url, timeout=timeout, stream=True) as response:
+            if not response.ok or "html" not in response.headers.get("Content-Type", "html"):
+                return None
+            parser = LandingPageParser()
+            decoder = None
+            read = 0
+            for chunk in response.iter_content(chunk_size=64 * 1024):
+                if decoder is None:
+                    decoder = codecs.getincrementaldecoder(page_encoding(response, chunk))(errors="replace")
+                parser.feed(decoder.decode(chunk))
+                read += len(chunk)
+                if read >= max_bytes:
+                    break
+            parser.close()
+            count("bytes_received", read)
+    except Exception:
+        return None
+
+    matcher = compile_terms(keywords)
+    return {
+        "og_image": parser.meta.get("og:image"),
+        "twitter_image": parser.meta.get("twitter:image"),
+        "description": parser.meta.get("description"),
+        "first_p": parser.first_p,
+        "offer_texts": [t for t in parser.texts if matcher.search(t.lower())],
+    }
+
+
+def has_required_fields(data):
+    """
+    The HTTP tier is good enough when it found both an image and a description.
+    """
+    return bool(data and (data.get("og_image") or data.get("twitter_image")) and data.get("description"))
@@ -0,0 +1,244 @@
+# image_pipeline.py
+#
+# Gets product images to Telegram cheaply and safely. Image URLs are checked
+# concurrently (HEAD, or a one-byte range GET when HEAD doesn't say) for a
+# photo content type and a size Telegram accepts; a product whose image
+# fails is posted with sendMessage instead. With IMAGE_DOWNSCALE=1 images
+# are downscaled into a local JPEG cache and uploaded as multipart rather
+# than fetched by Telegram. The file_id Telegram returns for a photo is
+# kept per product and image hash, so later posts reuse it with no upload.
+
+import asyncio
+import hashlib
+import os
+from datetime import date
+from io import BytesIO
+
+from config import (
+    IMAGE_FILE_IDS_FILE, IMAGE_CHECK_CONCURRENCY, IMAGE_MAX_URL_BYTES, IMAGE_DOWNSCALE, IMAGE_CACHE_DIR,
+    IMAGE_MAX_DIMENSION,
+)
+from utils import get_http_session, setup_logger, load_json, write_json_atomic
+from instrumentation import timer, count
+
+logger = setup_logger()
+
+PHOTO_TYPES = ("image/jpeg", "image/png", "image/webp", "image/gif")
+MAX_DOWNLOAD_BYTES = 20 * 1024 * 1024  # don't pull anything bigger just to shrink it
+# sendPhoto 400 descriptions that blame the photo itself, not e.g. the caption's Markdown
+PHOTO_ERRORS = (
+    "wrong file identifier", "wrong remote file identifier", "failed to get http url content",
+    "wrong type of the web page content", "image_process_failed", "photo_invalid_dimensions",
+)
+
+
+def photo_rejected(body):
+    """
+    True if a failed sendPhoto response says Telegram couldn't use the photo.
+    """
+    description = (body or {}).get("description", "").lower()
+    return (body or {}).get("error_code") == 400 and any(error in description for error in PHOTO_ERRORS)
+
+
+def image_hash(url):
+    return hashlib.sha1(url.encode("utf-8")).hexdigest()[:16]
+
+
+def file_id_key(product):
+    return f"{product.get('name', '')}:{image_hash(product['image'])}"
+
+
+def load_file_ids(path=IMAGE_FILE_IDS_FILE):
+    return load_json(path)  # losing the map only costs re-uploads
+
+
+def save_file_ids(file_ids, path=IMAGE_FILE_IDS_FILE):
+    write_json_atomic(path, file_ids)
+
+
+def _total_size(response):
+    if response.status_code == 206:
+        total = response.headers.get("Content-Range", "").rsplit("/", 1)[-1]
+        return int(total) if total.isdigit() else None
+    length = response.headers.get("Content-Length", "")
+    return int(length) if length.isdigit() else None
+
+
+def check_image(session, url, timeout=10):
+    """
+    Returns {"status", "content_type", "size", "error"} for an image URL from
+    a HEAD request, falling back to a one-byte range GET when HEAD fails or
+    leaves out the type or size (many CDNs answer HEAD badly).
+    """
+    try:
+        response = session.head(url, allow_redirects=True, timeout=timeout)
+        if not response.ok or not response.headers.get("Content-Type") or _total_size(response) is None:
+            response = session.get(url, headers={"Range": "bytes=0-0"}, stream=True, allow_redirects=True, timeout=timeout)
+            response.close()
+    except Exception as e:
+        return {"status": None, "content_type": None, "size": None, "error": str(e)}
+    return {
+        "status": response.status_code,
+        "content_type": response.headers.get("Content-Type", "").split(";")[0].strip().lower(),
+        "size": _total_size(response),
+        "error": None,
+    }
+
+
+def usable_by_url(check, max_bytes=IMAGE_MAX_URL_BYTES):
+    return (
+        check["status"] is not None and check["status"] < 400
+        and check["content_type"] in PHOTO_TYPES
+        and (check["size"] is None or check["size"] <= max_bytes)
+    )
+
+
+def downscalable(check):
+    """
+    Raster images Pillow can re-encode, including ones too big to send by URL.
+    """
+    return (
+        check["status"] is not None and check["status"] < 400
+        and check["content_type"].startswith("image/") and "svg" not in check["content_type"]
+        and (check["size"] is None or check["size"] <= MAX_DOWNLOAD_BYTES)
+    )
+
+
+def describe(check):
+    if check["error"]:
+        return check["error"]
+    if check["status"] >= 400:
+        return f"HTTP {check['status']}"
+    size = f", {check['size'] // 1024} KB" if check["size"] else ""
+    return f"{check['content_type'] or 'unknown type'}{size}"
+
+
+def _pillow_available():
+    try:
+        import PIL  # noqa: F401
+    except ImportError:
+        logger.warning("⚠️ IMAGE_DOWNSCALE needs Pillow (pip install Pillow); sending image URLs instead.")
+        return False
+    return True
+
+
+class ImagePipeline:
+    """
+    Per-run image state: one validation task per image URL (started early by
+    prefetch()), the persisted file_id map, and the optional JPEG cache.
+    """
+    def __init__(self, session=None, file_ids_path=IMAGE_FILE_IDS_FILE, concurrency=IMAGE_CHECK_CONCURRENCY,
+                 downscale=IMAGE_DOWNSCALE, cache_dir=IMAGE_CACHE_DIR, max_dimension=IMAGE_MAX_DIMENSION):
+        self.session = session or get_http_session()
+        self.file_ids_path = file_ids_path
+        self.file_ids = load_file_ids(file_ids_path)
+        self.downscale = downscale and _pillow_available()
+        self.cache_dir = cache_dir
+        self.max_dimension = max_dimension
+        self._semaphore = asyncio.Semaphore(max(1, concurrency))
+        self._checks = {}
+        self._first_posts = {}
+        self._verdicts = {}  # file_id key -> photo_for() result, decided once per run
+
+    def prefetch(self, product):
+        """
+        Starts validating the product's image in the background, unless a
+        file_id for it is already known.
+        """
+        url = product.get("image")
+        if url and url not in self._checks and file_id_key(product) not in self.file_ids:
+            self._checks[url] = asyncio.ensure_future(self._check(url))
+
+    async def _check(self, url):
+        async with self._semaphore:
+            with timer("image_check"):
+                return await asyncio.to_thread(check_image, self.session, url)
+
+    async def photo_for(self, product):
+        """
+        Returns (photo, files) for sendPhoto: a stored file_id or the image URL
+        with files=None, or photo=None with a JPEG to upload as multipart.
+        None means the image is unusable and the post should be text only.
+        Every call must be followed by settle() once the post is sent.
+        """
+        key = file_id_key(product)
+        if key in self._first_posts:
+            # Another chat is posting this image right now; reuse its file_id
+            await self._first_posts[key]
+        else:
+            self._first_posts[key] = asyncio.get_running_loop().create_future()
+        known = self.file_ids.get(key)
+        if known:
+            count("image_file_id_reuse")
+            return known["file_id"], None
+
+        if key not in self._verdicts:
+            self._verdicts[key] = await self._decide(product)
+        return self._verdicts[key]
+
+    async def _decide(self, product):
+        url = product["image"]
+        self.prefetch(product)
+        check = await self._checks[url]
+        if self.downscale and downscalable(check):
+            path = await asyncio.to_thread(self._cached_jpeg, url)
+            if path:
+                with open(path, "rb") as f:
+                    count("image_uploads")
+                    return None, {"photo": (os.path.basename(path), f.read(), "image/jpeg")}
+        if usable_by_url(check):
+            return url, None
+        count("image_rejected")
+        logger.warning(f"🖼️ Unusable image for {product.get('name')}: {describe(check)}")
+        return None
+
+    def settle(self, product, result=None, rejected=False):
+        """
+        Stores the file_id from a successful sendPhoto result. If Telegram
+        rejected the photo, forgets the stored file_id, or if there was none
+        marks the image unusable for the other chats. Releases chats waiting
+        on this image.
+        """
+        key = file_id_key(product)
+        photos = (result or {}).get("photo")
+        if photos:
+            # Telegram returns every size it made; the last is the largest
+            self.file_ids[key] = {"file_id": photos[-1]["file_id"], "image": product["image"],
+                                  "saved_at": date.today().isoformat()}
+        elif rejected and self.file_ids.pop(key, None) is None:
+            # The URL or upload itself was refused; the other chats post text
+            self._verdicts[key] = None
+        future = self._first_posts.get(key)
+        if future and not future.done():
+            future.set_result(None)
+
+    def save(self):
+        save_file_ids(self.file_ids, self.file_ids_path)
+
+    def _cached_jpeg(self, url):
+        """
+        Path of the downscaled JPEG for url, downloading and converting it on
+        first use. None if the image can't be fetched or decoded.
+        """
+        from PIL import Image
+
+        path = os.path.join(self.cache_dir, image_hash(url) + ".jpg")
+        if os.path.exists(path):
+            return path
+        try:
+            response = self.session.get(url, timeout=20)
+            response.raise_for_status()
+            with Image.open(BytesIO(response.content)) as img:
+                img = img.convert("RGBA")
+                # Flatten transparency onto white: logos are often transparent PNGs
+                flat = Image.new("RGB", img.size, "white")
+                flat.paste(img, mask=img.getchannel("A"))
+                flat.thumbnail((self.max_dimension, self.max_dimension))
+                os.makedirs(self.cache_dir, exist_ok=True)
+                tmp_path = path + ".tmp"
+                flat.save(tmp_path, "JPEG", quality=85, optimize=True)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            logger.warning(f"⚠️ Couldn't downscale {url}: {e}")
+            return None
+        return path
@@ -0,0 +1,179 @@
+# instrumentation.py
+#
+# Lightweight run instrumentation: nestable timers, counters and per-site
+# fields, collected in memory and appended as one JSON line per run to
+# reports/run_reports.jsonl. Timers nest through contextvars, so concurrent
+# asyncio tasks each keep their own path and current site.
+#
+# Usage: python instrumentation.py summarize [--days 14] [--metric run/scrape ...]
+
+import argparse
+import json
+import os
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+
+from config import REPORT_FILE
+
+_current_path = ContextVar("instrumentation_path", default=())
+_current_site = ContextVar("instrumentation_site", default=None)
+
+
+class RunReport:
+    def __init__(self):
+        self.started_at = datetime.now()
+        self.start = time.perf_counter()
+        self.spans = []
+        self.counters = defaultdict(int)
+        self.sites = defaultdict(dict)
+
+    def as_dict(self):
+        return {
+            "run_id": self.started_at.strftime("%Y%m%d-%H%M%S"),
+            "started_at": self.started_at.isoformat(timespec="seconds"),
+            "duration_ms": round((time.perf_counter() - self.start) * 1000, 1),
+            "counters": dict(self.counters),
+            "sites": dict(self.sites),
+            "spans": self.spans,
+        }
+
+
+_report = RunReport()
+
+
+def reset_report():
+    global _report
+    _report = RunReport()
+
+
+@contextmanager
+def timer(name, **tags):
+    """
+    Times the enclosed block as a span named after its nesting path
+    (e.g. "run/scrape/site/goto"), tagged with the current site if any.
+    """
+    path = _current_path.get() + (name,)
+    token = _current_path.set(path)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = (time.perf_counter() - start) * 1000
+        _current_path.reset(token)
+        span = {"path": "/".join(path), "ms": round(elapsed, 2)}
+        site = _current_site.get()
+        if site:
+            span["site"] = site
+        span.update(tags)
+        _report.spans.append(span)
+
+
+@contextmanager
+def site_scope(site):
+    """
+    Attributes everything inside the block to `site` and records its latency.
+    """
+    token = _current_site.set(site)
+    start = time.perf_counter()
+    try:
+        with timer("site"):
+            yield
+    finally:
+        _report.sites[site]["latency_ms"] = round((time.perf_counter() - start) * 1000, 1)
+        _current_site.reset(token)
+
+
+def count(name, n=1):
+    """
+    Increments a run-wide counter, and the same counter on the current site.
+    """
+    _report.counters[name] += n
+    site = _current_site.get()
+    if site:
+        fields = _report.sites[site]
+        fields[name] = fields.get(name, 0) + n
+
+
+def annotate(site=None, **fields):
+    site = site or _current_site.get()
+    if site:
+        _report.sites[site].update(fields)
+
+
+def write_report(path=REPORT_FILE):
+    """
+    Appends this run's report as one JSON line and returns it.
+    """
+    report = _report.as_dict()
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(json.dumps(report, ensure_ascii=False, separators=(",", ":")) + "\n")
+    return report
+
+
+# --- Aggregation across runs ---
+
+def load_reports(path=REPORT_FILE):
+    if not os.path.exists(path):
+        return []
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def percentile(values, pct):
+    """
+    Nearest-rank percentile of a non-empty list.
+    """
+    ordered = sorted(values)
+    rank = max(1, -(-len(ordered) * pct // 100))
+    return ordered[int(rank) - 1]
+
+
+def daily_metrics(reports, metrics=None):
+    """
+    Groups samples by day: {metric: {day: [ms, ...]}}. Metrics are span paths,
+    plus "run" (whole-run duration) and "site_latency".
+    """
+    samples = defaultdict(lambda: defaultdict(list))
+    for report in reports:
+        day = report["started_at"][:10]
+        samples["run"][day].append(report["duration_ms"])
+        for fields in report.get("sites", {}).values():
+            if "latency_ms" in fields:
+                samples["site_latency"][day].append(fields["latency_ms"])
+        for span in report.get("spans", []):
+            samples[span["path"]][day].append(span["ms"])
+    if metrics:
+        return {m: samples[m] for m in metrics if m in samples}
+    return samples
+
+
+def summarize(path=REPORT_FILE, days=14, metrics=None):
+    reports = load_reports(path)
+    if not reports:
+        print(f"No reports in {path}")
+        return
+    for metric, by_day in sorted(daily_metrics(reports, metrics).items()):
+        print(f"\n{metric}")
+        print(f"  {'day':<10} {'n':>5} {'p50 ms':>10} {'p95 ms':>10}")
+        for day in sorted(by_day)[-days:]:
+            values = by_day[day]
+            print(f"  {day:<10} {len(values):>5} {percentile(values, 50):>10.1f} {percentile(values, 95):>10.1f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Aggregate run reports into daily p50/p95 trends.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    summary = sub.add_parser("summarize")
+    summary.add_argument("--file", default=REPORT_FILE)
+    summary.add_argument("--days", type=int, default=14)
+    summary.add_argument("--metric", nargs="*", help="Span paths to show (default: all)")
+    args = parser.parse_args(argv)
+    summarize(args.file, args.days, args.metric)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,65 +1,217 @@
+# main.py
+#
+# The bot's command line. Each stage can run on its own:
+#
+#   python main.py select            pick today's products into software_affiliates.json
+#   python main.py scrape [--refresh] enrich them with offers and images
+#   python main.py post              post software_affiliates.json to the channels
+#   python main.py run [--refresh]   select, then scrape and post as one pipeline (the default)
+#   python main.py bench <name> ...  benchmarks.py
+#   python main.py worker            keep a warm Chromium for later runs (scrape_worker.py)
+#   python main.py health            check catalog links and images (healthcheck.py)
+#
+# Importing this module has no side effects, and Playwright is only loaded
+# when a product actually needs a browser.
+
+import argparse
 import json
-import time
-import requests
 import re
 import os
 import sys
-from utils import setup_logger, clean_text, format_tags
-from config import BOT_TOKEN, CHANNEL_ID, POST_DELAY
+from utils import setup_logger, clean_text, format_tags, get_http_session
+from offer_text import OFFER_KEYWORDS, rank_offers
+from dom_extract import extract_offers_and_image, build_plan, resolve_all
+from http_extract import http_extract, has_required_fields
+from resource_policy import apply_resource_policy, format_resource_stats
+from telegram_sender import TelegramSender
+from image_pipeline import ImagePipeline, photo_rejected
+from instrumentation import timer, site_scope, count, annotate, write_report
+from extraction_profiles import load_profiles, save_profiles, domain_of
+from scrape_worker import WorkerClient
+from scrape_cache import load_cache, save_cache, is_fresh, fetch_validators, still_valid, touch, store
+from config import BOT_TOKEN, CHANNEL_IDS, POST_ORDERING, PIPELINE_QUEUE_SIZE, SCRAPE_CONCURRENCY, SCRAPE_SITE_TIMEOUT, BLOCK_HEAVY_RESOURCES
+from generate_today_products import generate_today_products, ensure_recorded
+from run_journal import RunJournal
 import asyncio
-from playwright.async_api import async_playwright
 
-# --- PART 1: Product selection (monthly rotation, history via post_history.json) ---
+logger = setup_logger()
 
-from generate_today_products import generate_today_products
 
-# Select and save today's products to software_affiliates.json,
-# and update post_history.json as needed.
-generate_today_products()
+# --- PART 1: Product selection (monthly rotation, history via post_history/) ---
 
-logger = setup_logger()
+def select_products():
+    """
+    Selects today's products into software_affiliates.json and records them
+    in the posting history.
+    """
+    with timer("select"):
+        generate_today_products()
 
 
 # --- PART 2: Scraping offers and images ---
 
-OFFER_KEYWORDS = ['off', 'free', 'save', '%', 'discount', 'deal']
+# The ui-avatars placeholder is fine for the standalone scraper, but a post
+# without a real image is better sent as a plain text message.
+EXCLUDED_STRATEGIES = ("avatar",)
+
+def apply_scrape_result(entry, offers, image, desc):
+    if offers:
+        entry["offers"] = offers
+    if image:
+        entry["image"] = image
+    # Only override description if it's missing in JSON.
+    if desc and not entry.get("desc"):
+        entry["desc"] = desc.strip()
 
-async def extract_offers_and_image(page, url):
-    offers = []
-    image = None
-    desc = ""
+async def scrape_entry(browser, entry, semaphore, profiles=None):
+    """
+    Scrapes one product in its own browser context, so a slow or broken
+    site can't affect the others. Enriches `entry` in place and returns the
+    raw (offers, image, desc) result, or None if the site timed out.
+    """
+    url = entry.get("website")
+
+    async with semaphore:
+        logger.info(f"🔍 Scraping: {entry['name']}")
+        context = await browser.new_context()
+        resource_stats = await apply_resource_policy(context) if BLOCK_HEAVY_RESOURCES else None
+        try:
+            page = await context.new_page()
+            offers, image, desc = await asyncio.wait_for(
+                extract_offers_and_image(page, url, entry.get("max_wait_ms"), entry.get("extraction"), EXCLUDED_STRATEGIES,
+                                         profiles=profiles),
+                timeout=SCRAPE_SITE_TIMEOUT,
+            )
+        except asyncio.TimeoutError:
+            logger.error(f"❌ Timed out scraping {url} after {SCRAPE_SITE_TIMEOUT}s")
+            return None
+        finally:
+            await context.close()
+            if resource_stats:
+                logger.info(f"🚫 {entry['name']}: {format_resource_stats(resource_stats)}")
+                count("bytes_received", resource_stats["bytes_received"])
+                count("requests_blocked", resource_stats["blocked"])
+
+    apply_scrape_result(entry, offers, image, desc)
+    logger.info(f"✅ Done: {entry['name']} | {len(offers)} offers | image: {'yes' if image else 'no'}")
+    return offers, image, desc
+
+async def scrape_entry_remote(worker, entry, profiles):
+    """
+    Scrapes one product on the warm scrape worker. Returns (served, result);
+    served is False when no worker is reachable, so the caller should launch
+    its own browser.
+    """
+    if not await worker.available():
+        return False, None
+    domain = domain_of(entry["website"])
+    logger.info(f"🔍 Scraping on worker: {entry['name']}")
     try:
-        await page.goto(url, timeout=30000)
-        await page.wait_for_timeout(4000)  # Let the page load
-
-        # Extract og:image
-        og_image = await page.query_selector('meta[property="og:image"]')
-        if og_image:
-            image = await og_image.get_attribute('content')
-
-        # Extract meta description for product blurb (fallback to first <p> if absent)
-        meta_desc = await page.query_selector('meta[name="description"]')
-        if meta_desc:
-            desc = await meta_desc.get_attribute('content')
+        with timer("worker"):
+            response = await worker.scrape(entry, EXCLUDED_STRATEGIES, profiles.get(domain))
+    except Exception as e:
+        logger.warning(f"⚠️ Scrape worker unreachable ({e!r}); falling back to a local browser")
+        return False, None
+    if not response.get("ok"):
+        logger.error(f"❌ Worker failed on {entry['website']}: {response.get('error')}")
+        return True, None
+
+    if response.get("profile"):
+        profiles[domain] = response["profile"]
+    else:
+        profiles.pop(domain, None)
+    count("bytes_received", response.get("bytes_received", 0))
+    count("requests_blocked", response.get("blocked", 0))
+    offers, image, desc = response["offers"], response["image"], response["desc"]
+    apply_scrape_result(entry, offers, image, desc)
+    logger.info(f"✅ Done: {entry['name']} | {len(offers)} offers | image: {'yes' if image else 'no'}")
+    return True, (offers, image, desc)
+
+async def check_cache(cache, data, refresh=False):
+    """
+    Splits products into cache hits (already enriched from the cache) and
+    misses that still need a browser render. Stale entries are revalidated
+    with concurrent HEAD requests; returns (misses, validators_by_url).
+    """
+    if refresh:
+        return [e for e in data if e.get("website")], {}
+
+    session = get_http_session()
+    stale = []
+    for entry in data:
+        url = entry.get("website")
+        if not url:
+            continue
+        record = cache.get(url)
+        if record and is_fresh(record):
+            touch(record)
+            apply_scrape_result(entry, record["offers"], record["image"], record["desc"])
         else:
-            first_p = await page.query_selector('p')
-            if first_p:
-                desc = await first_p.inner_text()
-
-        # Extract offer bullet points
-        elements = await page.query_selector_all('li, p')
-        for elem in elements:
-            text = await elem.inner_text()
-            if any(keyword in text.lower() for keyword in OFFER_KEYWORDS):
-                txt = text.strip().replace('\n', ' ')
-                if 10 <= len(txt) <= 300 and txt not in offers:
-                    offers.append(txt)
+            stale.append(entry)
 
-    except Exception as e:
-        logger.error(f"❌ Error scraping {url}: {e}")
-    return offers[:8], image, desc
+    validators = await asyncio.gather(
+        *(asyncio.to_thread(fetch_validators, session, e["website"]) for e in stale)
+    )
+    misses, validators_by_url = [], {}
+    for entry, found in zip(stale, validators):
+        url = entry["website"]
+        record = cache.get(url)
+        if record and still_valid(record, found):
+            touch(record, revalidated=True)
+            apply_scrape_result(entry, record["offers"], record["image"], record["desc"])
+        else:
+            misses.append(entry)
+            validators_by_url[url] = found
+    return misses, validators_by_url
 
-async def run_scraper():
+def extract_over_http(session, entry):
+    """
+    HTTP tier for one product: returns (offers, image, desc) when a plain
+    fetch found everything we need, or None to escalate to the browser.
+    """
+    if entry.get("needs_js"):
+        return None
+    url = entry["website"]
+    data = http_extract(session, url, OFFER_KEYWORDS)
+    if not has_required_fields(data):
+        return None
+    # Same strategies as the browser; the ones needing layout just aren't in `data`
+    return resolve_all(build_plan(entry.get("extraction"), EXCLUDED_STRATEGIES), data, url)
+
+class LazyBrowser:
+    """
+    Launches Chromium the first time a product actually needs it, so runs
+    served entirely from the cache or over HTTP never start a browser.
+    """
+    def __init__(self):
+        self._playwright = None
+        self._browser = None
+        self._lock = asyncio.Lock()
+
+    async def get(self):
+        async with self._lock:
+            if self._browser is None:
+                from playwright.async_api import async_playwright
+
+                with timer("browser_launch"):
+                    self._playwright = await async_playwright().start()
+                    self._browser = await self._playwright.chromium.launch(headless=True)
+        return self._browser
+
+    async def close(self):
+        if self._browser is not None:
+            await self._browser.close()
+            await self._playwright.stop()
+
+async def run_scraper(concurrency=SCRAPE_CONCURRENCY, refresh=False, on_ready=None, journal=None):
+    """
+    Enriches today's products (cache, then HTTP, then browser) and writes them
+    back to software_affiliates.json. If given, `await on_ready(index, entry)`
+    is called as soon as each product is finished, in completion order.
+    With a RunJournal, products it already holds are reused as they are
+    (unless `refresh`) and every successfully scraped product is checkpointed;
+    failed ones are tried again on resume.
+    """
     try:
         with open("software_affiliates.json", "r", encoding="utf-8") as f:
             data = json.load(f)
@@ -67,31 +219,91 @@ async def run_scraper():
         logger.error("❌ software_affiliates.json not found after product selection.")
         return []
 
-    async with async_playwright() as p:
-        browser = await p.chromium.launch(headless=True)
-        context = await browser.new_context()
-        page = await context.new_page()
-
-        for entry in data:
-            url = entry.get("website")
-            if not url:
-                logger.error(f"No website for {entry.get('name', '')}")
-                continue
-            logger.info(f"🔍 Scraping: {entry['name']}")
-            offers, image, desc = await extract_offers_and_image(page, url)
-            if offers:
-                entry["offers"] = offers
-            if image:
-                entry["image"] = image
-            # Only override description if it's missing in JSON.
-            if desc and not entry.get("desc"):
-                entry["desc"] = desc.strip()
-            logger.info(f"✅ Done: {entry['name']} | {len(offers)} offers | image: {'yes' if image else 'no'}")
+    resumed = set()
+    for index, entry in enumerate(data):
+        saved = journal.scraped(entry.get("name", "")) if journal and not refresh else None
+        if saved:
+            data[index] = saved
+            resumed.add(index)
+    todo = [e for i, e in enumerate(data) if i not in resumed]
+
+    cache = load_cache()
+    profiles = load_profiles()
+    with timer("cache_check"):
+        misses, validators_by_url = await check_cache(cache, todo, refresh)
+    hits = sum(1 for e in todo if e.get("website")) - len(misses)
+    count("cache_hit", hits)
+    count("cache_miss", len(misses))
+    logger.info(f"🗃️ Scrape cache: {hits} hits, {len(misses)} misses{' (refresh forced)' if refresh else ''}")
+
+    async def ready(index):
+        if journal and index not in resumed and tiers.get(data[index].get("name", "")) not in ("failed", "none"):
+            journal.record_scraped(data[index])
+        if on_ready:
+            await on_ready(index, data[index])
+
+    tiers = {}
+    miss_ids = {id(e) for e in misses}
+    for index, entry in enumerate(data):
+        if index in resumed:
+            tiers[entry.get("name", "")] = "journal"
+            await ready(index)
+        elif not entry.get("website"):
+            logger.error(f"No website for {entry.get('name', '')}")
+            tiers[entry.get("name", "")] = "none"
+            await ready(index)
+        elif id(entry) not in miss_ids:
+            tiers[entry["name"]] = "cache"
+            annotate(site=entry["name"], tier="cache")
+            await ready(index)
+
+    session = get_http_session()
+    worker = WorkerClient()
+    browser = LazyBrowser()
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async def process(index):
+        entry = data[index]
+        url = entry["website"]
+        with site_scope(entry["name"]):
+            # Static pages are served by a plain HTTP fetch; only the rest need Chromium
+            with timer("http"):
+                result = await asyncio.to_thread(extract_over_http, session, entry)
+            if result:
+                apply_scrape_result(entry, *result)
+                tiers[entry["name"]] = "http"
+                logger.info(f"✅ Done over HTTP: {entry['name']} | {len(result[0])} offers")
+            else:
+                # A warm worker skips Chromium's cold start; without one, launch it here.
+                # Worker jobs share the semaphore, so none sit queued into their timeout
+                async with semaphore:
+                    served, result = await scrape_entry_remote(worker, entry, profiles)
+                if not served:
+                    result = await scrape_entry(await browser.get(), entry, semaphore, profiles)
+                tiers[entry["name"]] = ("worker" if served else "browser") if result else "failed"
+            annotate(tier=tiers[entry["name"]])
+        # Only cache results that actually found something
+        if result and (result[0] or result[1]):
+            store(cache, url, *result, validators_by_url.get(url))
+        await ready(index)
 
+    try:
+        # Entries are enriched in place, so `data` keeps its input order
+        with timer("scrape"):
+            await asyncio.gather(*(process(i) for i, entry in enumerate(data) if id(entry) in miss_ids))
+    finally:
         await browser.close()
+        save_cache(cache)
+        save_profiles(profiles)
+
+    counts = {tier: list(tiers.values()).count(tier) for tier in ("journal", "cache", "http", "worker", "browser", "failed")}
+    logger.info(
+        f"📊 Served by tier: {counts['journal']} resumed, {counts['cache']} cache, {counts['http']} http, "
+        f"{counts['worker']} worker, {counts['browser']} browser, {counts['failed']} failed | "
+        + ", ".join(f"{name}: {tier}" for name, tier in tiers.items())
+    )
 
-    with open("software_affiliates.json", "w", encoding="utf-8") as f:
-        json.dump(data, f, indent=2, ensure_ascii=False)
+    save_products(data)
     logger.info("✅ Scraping and enrichment complete.")
     return data  # return enriched products
 
@@ -111,23 +323,16 @@ def escape_markdown(text):
 def format_offers(offers):
     if not offers:
         return ""
-    skip_terms = [
-        'wishlist', 'offer t&cs', 'notify', 'login', 'reminder', 'events', 'stock', 'price drop'
-    ]
-    clean_offers = []
-    for offer in offers:
-        txt = escape_markdown(clean_text(offer).replace('\n', ' ').strip())
-        if any(term in txt.lower() for term in skip_terms):
-            continue
-        if txt and len(txt) >= 10 and txt not in clean_offers:
-            clean_offers.append(txt)
-        if len(clean_offers) >= 3:
-            break
+    # Scraped offers arrive ranked; manual ones keep their order (no keyword filter)
+    clean_offers = [escape_markdown(o) for o in rank_offers(offers, keywords=None, limit=3, max_len=None)]
     if not clean_offers:
         return ""
     return "\n" + "\n".join([f"• {o}" for o in clean_offers])
 
-def send_post(product):
+def build_post(product):
+    """
+    Returns the Bot API (method, payload) for a product, without chat_id.
+    """
     name = product.get("name", "No Name")
     url = product.get("direct_affiliate_link") or product.get("affiliate_link", "")
     category = product.get("category", "Unknown")
@@ -153,46 +358,242 @@ def send_post(product):
         f"{tags_str}"
     )
 
-    payload = {
-        "chat_id": CHANNEL_ID,
-        "parse_mode": "Markdown",
-    }
-    try:
-        if image_url:
-            payload["photo"] = image_url
-            payload["caption"] = message
-            response = requests.post(f"https://api.telegram.org/bot{BOT_TOKEN}/sendPhoto", json=payload)
+    payload = {"parse_mode": "Markdown"}
+    if image_url:
+        payload["photo"] = image_url
+        payload["caption"] = message
+        return "sendPhoto", payload
+    payload["text"] = message
+    return "sendMessage", payload
+
+def as_text_post(payload):
+    """
+    Turns a sendPhoto payload into the equivalent sendMessage one.
+    """
+    text = payload["caption"]
+    payload = {k: v for k, v in payload.items() if k not in ("photo", "caption")}
+    return "sendMessage", {**payload, "text": text}
+
+
+async def send_post(sender, product, chat_id, images=None, journal=None):
+    """
+    Posts one product. With an ImagePipeline, photos go out as a reused
+    file_id, a checked URL or an upload, and unusable images fall back to a
+    text message. With a RunJournal, a post it already records is skipped
+    and a new one is recorded with its message_id.
+    """
+    name = product.get("name", "No Name")
+    message_id = journal.posted(name, chat_id) if journal else None
+    if message_id:
+        logger.info(f"⏭️ Already posted: {name} -> {chat_id} (message {message_id})")
+        return {"message_id": message_id}
+    method, payload = build_post(product)
+    payload["chat_id"] = chat_id
+    files = None
+    if method == "sendPhoto" and images:
+        photo = await images.photo_for(product)
+        if photo is None:
+            images.settle(product)
+            method, payload = as_text_post(payload)
         else:
-            payload["text"] = message
-            response = requests.post(f"https://api.telegram.org/bot{BOT_TOKEN}/sendMessage", json=payload)
-    except Exception as e:
-        logger.error(f"❌ Exception sending message for {name}: {e}")
-        return
+            payload["photo"], files = photo
+            if files:
+                del payload["photo"]
+
+    body = await sender.call(method, payload, files)
+    if method == "sendPhoto" and images:
+        rejected = photo_rejected(body)
+        images.settle(product, body["result"] if body and body.get("ok") else None, rejected)
+        if rejected:
+            # Telegram couldn't use the photo (bad URL, stale file_id): post the text alone
+            logger.warning(f"🖼️ {name}: photo rejected ({body.get('description')}), sending as text")
+            method, payload = as_text_post(payload)
+            body = await sender.call(method, payload)
+
+    if body and body.get("ok"):
+        logger.info(f"✅ Sent: {name} -> {chat_id}")
+        annotate(site=name, **{f"post:{chat_id}": body["result"].get("message_id")})
+        if journal:
+            journal.record_posted(name, chat_id, body["result"].get("message_id"))
+        return body["result"]
+    logger.error(f"❌ Failed: {name} -> {chat_id} | Error: {body}")
+    annotate(site=name, **{f"post:{chat_id}": "failed"})
+    return None
+
+async def post_all(products, chat_ids=CHANNEL_IDS, journal=None):
+    """
+    Posts every product to every channel. Each channel gets the products in
+    order; channels are posted to concurrently. Pacing comes from the
+    sender's rate limiters, not fixed sleeps.
+    """
+    sender = TelegramSender(BOT_TOKEN)
+    images = ImagePipeline()
+    for product in products:
+        images.prefetch(product)
 
-    if response.ok:
-        logger.info(f"✅ Sent: {name}")
-    else:
-        logger.error(f"❌ Failed: {name} | Error: {response.text}")
+    async def post_to_chat(chat_id):
+        return [await send_post(sender, product, chat_id, images, journal) for product in products]
+
+    try:
+        return await asyncio.gather(*(post_to_chat(chat_id) for chat_id in chat_ids))
+    finally:
+        images.save()
 
 
+# --- PART 4: Streaming scrape -> post pipeline ---
 
-if __name__ == "__main__":
+async def run_pipeline(refresh=False, ordering=POST_ORDERING, queue_size=PIPELINE_QUEUE_SIZE, chat_ids=CHANNEL_IDS,
+                       journal=None):
+    """
+    Scrapes and posts concurrently: each product is queued for posting as soon
+    as its scrape finishes. With ordering="ordered" posts keep the selection
+    order (a product waits for the ones before it); with "as_completed" they
+    go out as soon as they're ready. The bounded queue applies backpressure
+    to the scrapers when posting falls behind.
+    """
+    queue = asyncio.Queue(maxsize=max(1, queue_size))
+    done = object()
+
+    async def produce():
+        try:
+            return await run_scraper(refresh=refresh, on_ready=lambda i, e: queue.put((i, e)), journal=journal)
+        finally:
+            await queue.put(done)
+
+    async def consume():
+        sender = TelegramSender(BOT_TOKEN)
+        images = ImagePipeline()
+        pending, next_index = {}, 0
+        try:
+            while True:
+                item = await queue.get()
+                if item is done:
+                    break
+                index, product = item
+                # Image checks start on arrival, so they overlap with earlier posts
+                images.prefetch(product)
+                if ordering != "ordered":
+                    await asyncio.gather(*(send_post(sender, product, chat_id, images, journal) for chat_id in chat_ids))
+                    continue
+                pending[index] = product
+                while next_index in pending:
+                    product = pending.pop(next_index)
+                    await asyncio.gather(*(send_post(sender, product, chat_id, images, journal) for chat_id in chat_ids))
+                    next_index += 1
+        finally:
+            images.save()
+
+    data, _ = await asyncio.gather(produce(), consume())
+    return data
+
+
+# --- PART 5: Command line ---
+
+def load_products():
+    try:
+        with open("software_affiliates.json", "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return []
+
+
+def save_products(products):
+    with open("software_affiliates.json", "w", encoding="utf-8") as f:
+        json.dump(products, f, indent=2, ensure_ascii=False)
+
+
+def todays_journal():
+    """
+    Today's RunJournal if a selection was checkpointed, else None.
+    """
+    journal = RunJournal()
+    return journal if journal.selected else None
+
+
+def cmd_select(args):
+    select_products()
+    products = load_products()
+    RunJournal().start(products)
+    return products
+
+
+def cmd_scrape(args):
+    return asyncio.run(run_scraper(refresh=args.refresh, journal=todays_journal()))
+
+
+def cmd_post(args):
+    products = load_products()
+    if products:
+        asyncio.run(post_all(products, journal=todays_journal()))
+    return products
+
+
+def cmd_run(args):
     logger.info("🚀 Starting unified affiliate bot: select, scrape, post.")
+    journal = RunJournal()
+    if journal.selected:
+        # An earlier run today died midway: keep its selection and skip finished work
+        logger.info(f"♻️ Resuming today's run ({journal.progress()})")
+        ensure_recorded(journal.selected)
+        save_products(journal.selected)
+    else:
+        select_products()
+        journal.start(load_products())
+    # SCRAPE AND POST, streaming each product to Telegram as soon as it's enriched
+    products = asyncio.run(run_pipeline(refresh=args.refresh, journal=journal))
+    if journal.complete(CHANNEL_IDS):
+        journal.finish()
+    else:
+        logger.warning(f"⚠️ Run incomplete ({journal.progress()}); rerun to retry the rest.")
+    return products
+
+
+COMMANDS = {"select": cmd_select, "scrape": cmd_scrape, "post": cmd_post, "run": cmd_run}
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else list(argv)
+    if argv[:1] == ["bench"]:
+        import benchmarks
+
+        return benchmarks.main(argv[1:])
+    if argv[:1] == ["worker"]:
+        import scrape_worker
+
+        return scrape_worker.main(argv[1:])
+    if argv[:1] == ["health"]:
+        import healthcheck
+
+        return healthcheck.main(argv[1:])
+    # Plain `python main.py [--refresh]` keeps meaning a full run
+    if not argv or argv[0] not in COMMANDS and argv[0] not in ("-h", "--help"):
+        argv = ["run"] + argv
+
+    parser = argparse.ArgumentParser(description="Software affiliate bot.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("select", help="Pick today's products into software_affiliates.json")
+    scrape = sub.add_parser("scrape", help="Enrich software_affiliates.json with offers and images")
+    scrape.add_argument("--refresh", action="store_true", help="Ignore the scrape cache and render every site again")
+    sub.add_parser("post", help="Post software_affiliates.json to the channels")
+    run = sub.add_parser("run", help="select, then scrape and post as a streaming pipeline (default)")
+    run.add_argument("--refresh", action="store_true", help="Ignore the scrape cache and render every site again")
+    sub.add_parser("bench", help="Run benchmarks.py (python main.py bench --help)")
+    sub.add_parser("worker", help="Serve scrape jobs from a warm Chromium (python main.py worker --help)")
+    sub.add_parser("health", help="Check catalog links and images (python main.py health --help)")
+    args = parser.parse_args(argv)
 
     # Fix for Playwright/asyncio on Windows, if needed
     if sys.platform.startswith("win"):
         asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
 
-    # SCRAPE AND ENRICH
-    actloop = asyncio.get_event_loop()
-    enriched_products = actloop.run_until_complete(run_scraper())
-    if not enriched_products:
-        logger.error("No products found after enrichment, exiting.")
-        exit(1)
-
-    # POST TO TELEGRAM
-    for product in enriched_products:
-        send_post(product)
-        time.sleep(POST_DELAY)
+    with timer("run", command=args.command):
+        products = COMMANDS[args.command](args)
+    write_report()
+    if not products:
+        logger.error("No products found, exiting.")
+        return 1
+    return 0
 
 
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,90 @@
+# offer_text.py
+#
+# Offer-text processing in one pass: every candidate text is cleaned once,
+# matched against a single precompiled alternation regex for the offer
+# keywords and another for the skip terms, deduplicated by a normalized
+# hash key, scored and ranked. Used by both extraction tiers (dom_extract,
+# http_extract) and by format_offers when building posts.
+
+import heapq
+import re
+from functools import lru_cache
+
+OFFER_KEYWORDS = ['off', 'free', 'save', '%', 'discount', 'deal']
+
+# Account/shop chrome that contains offer keywords but isn't an offer
+SKIP_TERMS = ['wishlist', 'offer t&cs', 'notify', 'login', 'reminder', 'events', 'stock', 'price drop']
+
+# Concrete amounts make an offer worth more than a bare "free" or "deal"
+AMOUNT = re.compile(r"\d+(?:[.,]\d+)?\s*%|[$€£₹]\s*\d|\d+\s*(?:days?|months?)\b", re.I)
+
+_WHITESPACE = re.compile(r"\s+")
+_NON_WORD = re.compile(r"[\W_]+")
+
+
+def _by_length(terms):
+    # Longest first, so overlapping terms report the most specific match
+    return sorted(set(terms), key=len, reverse=True)
+
+
+@lru_cache(maxsize=16)
+def _compile(terms):
+    return re.compile("|".join(re.escape(t) for t in _by_length(terms)))
+
+
+def compile_terms(terms):
+    """
+    One regex matching any of the terms as a substring of lowercased text,
+    or None for an empty list. Cached, so callers can pass plain lists.
+    """
+    terms = tuple(t.lower() for t in terms if t)
+    return _compile(terms) if terms else None
+
+
+def js_pattern(terms):
+    """
+    The same alternation as a JavaScript RegExp source, for in-page filtering.
+    """
+    return "|".join(
+        re.sub(r"[.*+?^${}()|[\]\\/]", r"\\\g<0>", t) for t in _by_length(t.lower() for t in terms if t)
+    )
+
+
+def dedup_key(text):
+    """
+    Texts differing only in case, punctuation or spacing count as one offer.
+    """
+    return _NON_WORD.sub(" ", text.casefold()).strip()
+
+
+def rank_offers(texts, keywords=OFFER_KEYWORDS, skip_terms=SKIP_TERMS, limit=8, min_len=10, max_len=300):
+    """
+    Cleans, filters, deduplicates and ranks candidate offer texts in a single
+    pass. With keywords=None every text qualifies and keeps its page order;
+    otherwise texts are ranked by distinct keywords matched plus concrete
+    amounts (percentages, prices, trial lengths), ties in page order.
+    """
+    keyword_re = compile_terms(keywords) if keywords is not None else None
+    skip_re = compile_terms(skip_terms or ())
+    seen_raw, seen = set(), set()
+    scored = []
+    for position, text in enumerate(texts):
+        # Cheapest rejections first: exact repeats, then texts without a keyword
+        if not text or text in seen_raw:
+            continue
+        seen_raw.add(text)
+        lower = text.lower()
+        if keyword_re and not keyword_re.search(lower):
+            continue
+        txt = " ".join(text.split())
+        if len(txt) < min_len or (max_len and len(txt) > max_len):
+            continue
+        if skip_re and skip_re.search(lower):
+            continue
+        key = dedup_key(txt)
+        if key in seen:
+            continue
+        seen.add(key)
+        score = len(set(keyword_re.findall(lower))) + 2 * len(AMOUNT.findall(txt)) if keyword_re else 0
+        scored.append((-score, position, txt))
+    return [txt for _, _, txt in heapq.nsmallest(limit, scored)]
@@ -0,0 +1,79 @@
+# run_journal.py
+#
+# Checkpoints of today's run, so a job that dies halfway can be rerun and
+# carry on where it stopped:
+#
+#   {"date": "2026-10-17", "selected": [products], "scraped": {name: product},
+#    "posted": {name: {chat_id: message_id}}, "finished": false}
+#
+# Every checkpoint rewrites the file atomically (tmp + rename), so a crash
+# leaves either the previous state or the new one. A post is recorded as
+# soon as Telegram confirms it; only a crash inside that gap can repeat a
+# message.
+
+from datetime import date
+
+from config import RUN_JOURNAL_FILE
+from utils import load_json, write_json_atomic
+
+
+class RunJournal:
+    """
+    Today's journal. A journal from an earlier day, or one whose run
+    finished, is ignored, so the first run of a day always starts fresh.
+    """
+    def __init__(self, path=RUN_JOURNAL_FILE, today=None):
+        self.path = path
+        self.today = today or date.today().isoformat()
+        self.state = self._load()
+
+    def _fresh(self):
+        return {"date": self.today, "selected": None, "scraped": {}, "posted": {}, "finished": False}
+
+    def _load(self):
+        state = load_json(self.path)
+        if state.get("date") != self.today or state.get("finished"):
+            return self._fresh()
+        return state
+
+    def checkpoint(self):
+        write_json_atomic(self.path, self.state, sort_keys=False)
+
+    @property
+    def selected(self):
+        return self.state["selected"]
+
+    def start(self, selected):
+        """
+        Begins a new run with today's selection, dropping any earlier progress.
+        """
+        self.state = self._fresh()
+        self.state["selected"] = selected
+        self.checkpoint()
+
+    def scraped(self, name):
+        return self.state["scraped"].get(name)
+
+    def record_scraped(self, entry):
+        self.state["scraped"][entry.get("name", "")] = entry
+        self.checkpoint()
+
+    def posted(self, name, chat_id):
+        return self.state["posted"].get(name, {}).get(str(chat_id))
+
+    def record_posted(self, name, chat_id, message_id):
+        self.state["posted"].setdefault(name, {})[str(chat_id)] = message_id
+        self.checkpoint()
+
+    def complete(self, chat_ids):
+        return bool(self.selected) and all(
+            self.posted(p.get("name", ""), chat_id) for p in self.selected for chat_id in chat_ids
+        )
+
+    def finish(self):
+        self.state["finished"] = True
+        self.checkpoint()
+
+    def progress(self):
+        posted = sum(len(chats) for chats in self.state["posted"].values())
+        return f"{len(self.selected or [])} selected, {len(self.state['scraped'])} scraped, {posted} posted"
@@ -0,0 +1,94 @@
+# scrape_cache.py
+#
+# On-disk cache of scrape results keyed by website URL, stored as JSON lines
+# (one record per URL). Entries younger than the TTL are used as-is; older
+# ones are revalidated with a HEAD request (ETag / Last-Modified) before we
+# pay for a full browser render.
+
+import json
+import os
+import time
+
+from config import SCRAPE_CACHE_FILE, SCRAPE_CACHE_TTL_HOURS, SCRAPE_CACHE_MAX_ENTRIES
+from utils import write_jsonl_atomic
+
+
+def load_cache(path=SCRAPE_CACHE_FILE):
+    cache = {}
+    if not os.path.exists(path):
+        return cache
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # skip a torn line rather than losing the whole cache
+            cache[record["url"]] = record
+    return cache
+
+
+def save_cache(cache, path=SCRAPE_CACHE_FILE, max_entries=SCRAPE_CACHE_MAX_ENTRIES):
+    """
+    Writes the cache back, keeping only the max_entries most recently used records.
+    """
+    records = sorted(cache.values(), key=lambda r: r.get("last_used", 0), reverse=True)[:max_entries]
+    write_jsonl_atomic(path, records)
+
+
+def is_fresh(record, ttl_hours=SCRAPE_CACHE_TTL_HOURS, now=None):
+    now = now or time.time()
+    return now - record.get("scraped_at", 0) < ttl_hours * 3600
+
+
+def fetch_validators(session, url, timeout=10):
+    """
+    HEADs the URL and returns its ETag / Last-Modified headers, or None if the
+    request failed. Both values may be None when the server sends neither.
+    """
+    try:
+        response = session.head(url, allow_redirects=True, timeout=timeout)
+    except Exception:
+        return None
+    if not response.ok:
+        return None
+    return {
+        "etag": response.headers.get("ETag"),
+        "last_modified": response.headers.get("Last-Modified"),
+    }
+
+
+def still_valid(record, validators):
+    """
+    True when the server's validators prove the page hasn't changed since the record was scraped.
+    """
+    if not validators:
+        return False
+    if validators["etag"] and validators["etag"] == record.get("etag"):
+        return True
+    if validators["last_modified"] and validators["last_modified"] == record.get("last_modified"):
+        return True
+    return False
+
+
+def touch(record, revalidated=False):
+    record["last_used"] = time.time()
+    if revalidated:
+        record["scraped_at"] = record["last_used"]
+
+
+def store(cache, url, offers, image, desc, validators=None):
+    now = time.time()
+    validators = validators or {}
+    cache[url] = {
+        "url": url,
+        "offers": offers,
+        "image": image,
+        "desc": desc,
+        "etag": validators.get("etag"),
+        "last_modified": validators.get("last_modified"),
+        "scraped_at": now,
+        "last_used": now,
+    }
@@ -0,0 +1,276 @@
+# scrape_worker.py
+#
+# Optional long-lived scraper. It keeps one warm Chromium with a pool of
+# ready browser contexts and serves scrape jobs over a local TCP socket,
+# one JSON line per request and per response. A context is replaced after
+# WORKER_RECYCLE_AFTER pages to limit memory growth. main.py uses the
+# worker when it answers a ping and launches its own browser otherwise.
+#
+# Usage: python main.py worker [--contexts 4] [--recycle-after 50]
+#
+#   {"op": "ping"}   -> {"ok": true, "pages": n, "recycled": n, "launches": n}
+#   {"op": "scrape", "url": ..., "max_wait_ms": ..., "extraction": {...},
+#    "exclude": [...], "profile": {...}}
+#                    -> {"ok": true, "offers": [...], "image": ..., "desc": ...,
+#                        "profile": {...}, "bytes_received": n, "blocked": n}
+#
+# Extraction profiles stay with the caller: each job carries the domain's
+# profile and gets the updated one back.
+
+import argparse
+import asyncio
+import json
+from contextlib import asynccontextmanager
+
+from config import (
+    SCRAPE_WORKER, SCRAPE_WORKER_ADDRESS, WORKER_RECYCLE_AFTER, SCRAPE_CONCURRENCY, SCRAPE_SITE_TIMEOUT,
+    BLOCK_HEAVY_RESOURCES,
+)
+from extraction_profiles import domain_of
+from utils import setup_logger
+
+logger = setup_logger("scrape_worker")
+
+MAX_LINE_BYTES = 1024 * 1024
+
+
+def parse_address(address):
+    host, port = address.rsplit(":", 1)
+    return host, int(port)
+
+
+# --- Worker side ---
+
+class ContextPool:
+    """
+    `size` browser contexts handed out one job at a time. A context that has
+    served `recycle_after` pages is closed; its replacement is created when
+    the slot is next leased.
+    """
+    def __init__(self, browser, size, recycle_after, block_resources=BLOCK_HEAVY_RESOURCES):
+        self.browser = browser
+        self.recycle_after = recycle_after
+        self.block_resources = block_resources
+        self.pages_served = 0
+        self.recycled = 0
+        self._slots = asyncio.Queue()
+        for _ in range(max(1, size)):
+            self._slots.put_nowait(None)
+
+    async def _new_slot(self):
+        from resource_policy import apply_resource_policy
+
+        context = await self.browser.new_context()
+        stats = await apply_resource_policy(context) if self.block_resources else None
+        return {"context": context, "stats": stats, "pages": 0}
+
+    async def warm_up(self):
+        """
+        Creates every context up front, so the first jobs don't pay for it.
+        """
+        slots = [await self._slots.get() for _ in range(self._slots.qsize())]
+        for slot in slots:
+            self._slots.put_nowait(slot or await self._new_slot())
+
+    @asynccontextmanager
+    async def lease(self):
+        from resource_policy import new_resource_stats
+
+        slot = await self._slots.get()
+        try:
+            if slot is None:
+                slot = await self._new_slot()
+            if slot["stats"]:
+                slot["stats"].update(new_resource_stats())  # stats are per job
+            yield slot
+        finally:
+            if slot is not None:
+                slot["pages"] += 1
+                self.pages_served += 1
+                if slot["pages"] >= self.recycle_after:
+                    self.recycled += 1
+                    try:
+                        await slot["context"].close()
+                    except Exception:
+                        pass
+                    slot = None
+            self._slots.put_nowait(slot)
+
+    async def close(self):
+        while not self._slots.empty():
+            slot = self._slots.get_nowait()
+            if slot:
+                await slot["context"].close()
+
+
+class ScrapeWorker:
+    def __init__(self, contexts=SCRAPE_CONCURRENCY, recycle_after=WORKER_RECYCLE_AFTER):
+        self.contexts = contexts
+        self.recycle_after = recycle_after
+        self.launches = 0
+        self.browser = None
+        self.pool = None
+        self._playwright = None
+        self._launch_lock = asyncio.Lock()
+
+    async def start(self):
+        from playwright.async_api import async_playwright
+
+        self._playwright = await async_playwright().start()
+        await self._launch()
+
+    async def _launch(self):
+        self.browser = await self._playwright.chromium.launch(headless=True)
+        self.pool = ContextPool(self.browser, self.contexts, self.recycle_after)
+        await self.pool.warm_up()
+        self.launches += 1
+        logger.info(f"🔥 Chromium ready with {self.contexts} warm contexts (launch #{self.launches})")
+
+    async def _ensure_browser(self):
+        async with self._launch_lock:
+            if not self.browser.is_connected():
+                logger.warning("⚠️ Browser went away, relaunching")
+                await self._launch()
+
+    def stats(self):
+        return {"pages": self.pool.pages_served, "recycled": self.pool.recycled, "launches": self.launches}
+
+    async def scrape(self, job):
+        await self._ensure_browser()
+        # The deadline includes waiting for a free context, so a job never
+        # outlives the client's timeout (SCRAPE_SITE_TIMEOUT plus slack)
+        return await asyncio.wait_for(self._scrape(job), timeout=SCRAPE_SITE_TIMEOUT)
+
+    async def _scrape(self, job):
+        from dom_extract import extract_offers_and_image
+
+        url = job["url"]
+        domain = domain_of(url)
+        profiles = {domain: job["profile"]} if job.get("profile") else {}
+        async with self.pool.lease() as slot:
+            page = await slot["context"].new_page()
+            try:
+                offers, image, desc = await extract_offers_and_image(
+                    page, url, job.get("max_wait_ms"), job.get("extraction"), tuple(job.get("exclude", ())),
+                    profiles=profiles,
+                )
+            finally:
+                await page.close()
+            stats = slot["stats"] or {}
+            return {
+                "ok": True, "offers": offers, "image": image, "desc": desc, "profile": profiles.get(domain),
+                "bytes_received": stats.get("bytes_received", 0), "blocked": stats.get("blocked", 0),
+            }
+
+    async def handle(self, reader, writer):
+        try:
+            while line := await reader.readline():
+                try:
+                    job = json.loads(line)
+                    if job.get("op") == "ping":
+                        response = {"ok": True, **self.stats()}
+                    elif job.get("op") == "scrape":
+                        logger.info(f"🔍 Scraping: {job['url']}")
+                        response = await self.scrape(job)
+                    else:
+                        response = {"ok": False, "error": f"unknown op {job.get('op')!r}"}
+                except asyncio.TimeoutError:
+                    response = {"ok": False, "error": f"timed out after {SCRAPE_SITE_TIMEOUT}s"}
+                except Exception as e:
+                    response = {"ok": False, "error": str(e)}
+                writer.write((json.dumps(response, ensure_ascii=False) + "\n").encode("utf-8"))
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass  # client went away mid-job
+        finally:
+            writer.close()
+
+    async def close(self):
+        if self.pool:
+            await self.pool.close()
+        if self.browser:
+            await self.browser.close()
+        if self._playwright:
+            await self._playwright.stop()
+
+
+async def serve(address=SCRAPE_WORKER_ADDRESS, contexts=SCRAPE_CONCURRENCY, recycle_after=WORKER_RECYCLE_AFTER):
+    worker = ScrapeWorker(contexts, recycle_after)
+    await worker.start()
+    host, port = parse_address(address)
+    server = await asyncio.start_server(worker.handle, host, port, limit=MAX_LINE_BYTES)
+    logger.info(f"🚀 Scrape worker listening on {address}")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        await worker.close()
+
+
+# --- Client side (used by main.py) ---
+
+class WorkerClient:
+    """
+    Talks to a running scrape worker. The first available() call pings it;
+    after a connection error the worker isn't used again for this run.
+    """
+    def __init__(self, address=SCRAPE_WORKER_ADDRESS, mode=SCRAPE_WORKER):
+        self.address = address
+        self._available = None if mode != "off" else False
+        self._lock = asyncio.Lock()
+
+    async def _request(self, message, timeout):
+        host, port = parse_address(self.address)
+        reader, writer = await asyncio.wait_for(asyncio.open_connection(host, port, limit=MAX_LINE_BYTES), 2)
+        try:
+            writer.write((json.dumps(message, ensure_ascii=False) + "\n").encode("utf-8"))
+            await writer.drain()
+            line = await asyncio.wait_for(reader.readline(), timeout)
+        finally:
+            writer.close()
+        if not line:
+            raise ConnectionError("scrape worker closed the connection")
+        return json.loads(line)
+
+    async def available(self):
+        async with self._lock:
+            if self._available is None:
+                try:
+                    pong = await self._request({"op": "ping"}, timeout=2)
+                    self._available = bool(pong.get("ok"))
+                except (OSError, asyncio.TimeoutError, ValueError):
+                    self._available = False
+                if self._available:
+                    logger.info(f"🔥 Using the warm scrape worker at {self.address} ({pong['pages']} pages served)")
+        return self._available
+
+    async def scrape(self, entry, exclude=(), profile=None, timeout=SCRAPE_SITE_TIMEOUT + 10):
+        """
+        Runs one job on the worker and returns its response. Raises on
+        connection problems, after which available() is False.
+        """
+        try:
+            return await self._request({
+                "op": "scrape", "url": entry["website"], "max_wait_ms": entry.get("max_wait_ms"),
+                "extraction": entry.get("extraction"), "exclude": list(exclude), "profile": profile,
+            }, timeout)
+        except (OSError, asyncio.TimeoutError, ValueError):
+            self._available = False
+            raise
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Keep a warm Chromium and serve scrape jobs locally.")
+    parser.add_argument("--address", default=SCRAPE_WORKER_ADDRESS, help="host:port to listen on")
+    parser.add_argument("--contexts", type=int, default=SCRAPE_CONCURRENCY, help="Browser contexts in the pool")
+    parser.add_argument("--recycle-after", type=int, default=WORKER_RECYCLE_AFTER,
+                        help="Pages a context serves before it is replaced")
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(serve(args.address, args.contexts, args.recycle_after))
+    except KeyboardInterrupt:
+        logger.info("👋 Scrape worker stopped.")
+
+
+if __name__ == "__main__":
+    main()
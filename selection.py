@@ -0,0 +1,89 @@
+# selection.py
+#
+# Weighted, history-aware product selection. Each eligible product gets
+#
+#   weight = base * recency
+#
+#   base     the catalog's optional "weight" field (e.g. conversion), default 1
+#   recency  1 - 0.5 ** (days since last post / RECENCY_HALF_LIFE_DAYS), from
+#            the posting history of this and last month, so a product
+#            posted on the 31st isn't favoured again on the 1st
+#
+# k products are drawn without replacement with Efraimidis-Spirakis keys
+# (u ** (1 / w)) kept in a size-k heap: one pass over a stream, O(n log k)
+# time and O(k) memory. Pass a seeded random.Random for reproducible picks.
+#
+# Deferred: favouring products with fresh offers. Sites are only scraped on
+# the day their product is posted, so "offers changed lately" would just
+# mean "posted lately". That factor can be added once something refreshes
+# offers independently of posting.
+
+import heapq
+import math
+import random
+from datetime import date
+
+from config import RECENCY_HALF_LIFE_DAYS
+from history_store import load_month
+
+
+def weighted_sample(items, k, weight, rng=random):
+    """
+    k items drawn without replacement with probability proportional to
+    weight(item), in draw order. Items with weight <= 0 are never picked.
+    """
+    if k <= 0:
+        return []
+    heap = []  # (log key, tiebreak, item); the smallest key is evicted first
+    for n, item in enumerate(items):
+        w = weight(item)
+        if w <= 0:
+            continue
+        # log(u ** (1 / w)) keeps keys comparable for tiny u and huge w
+        key = math.log(1.0 - rng.random()) / w
+        if len(heap) < k:
+            heapq.heappush(heap, (key, n, item))
+        elif key > heap[0][0]:
+            heapq.heapreplace(heap, (key, n, item))
+    return [item for _, _, item in sorted(heap, reverse=True)]
+
+
+def previous_month_key(today):
+    first = today.replace(day=1)
+    return f"{first.year - (first.month == 1)}-{(first.month - 2) % 12 + 1:02d}"
+
+
+def load_last_posted(today=None):
+    """
+    {name: date last posted} over this and the previous month's history.
+    """
+    today = today or date.today()
+    last_posted = {}
+    for month_key in (previous_month_key(today), today.strftime("%Y-%m")):
+        for name, day in load_month(month_key).items():
+            last_posted[name] = max(day, last_posted.get(name, day))
+    return last_posted
+
+
+def recency_factor(last_day, today, half_life=RECENCY_HALF_LIFE_DAYS, floor=0.01):
+    """
+    Near 0 for a product posted today, 0.5 after one half-life, 1 if never
+    posted. Never quite 0, so a small category can still fill its quota.
+    """
+    if not last_day:
+        return 1.0
+    days = (today - date.fromisoformat(last_day)).days
+    return max(floor, 1.0 - 0.5 ** (max(days, 0) / half_life))
+
+
+def make_weight(last_posted, today=None, half_life=RECENCY_HALF_LIFE_DAYS):
+    """
+    The weight function for weighted_sample() (see the module header).
+    """
+    today = today or date.today()
+
+    def weight(product):
+        w = float(product.get("weight", 1.0))
+        return w * recency_factor(last_posted.get(product.get("name")), today, half_life)
+
+    return weight
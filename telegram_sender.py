@@ -0,0 +1,149 @@
+# telegram_sender.py
+#
+# Async Telegram Bot API client. All calls share one pooled requests session
+# (run in worker threads), are paced by token buckets for the bot-wide and
+# per-chat limits, honour 429 retry_after, and retry transient failures
+# with exponential backoff. Only failures where Telegram can't have acted
+# on the request (no connection, 5xx) are retried: a timeout after the
+# request was sent may hide a delivered message, and resending it would
+# post it twice.
+
+import asyncio
+import random
+
+from config import (
+    TELEGRAM_GLOBAL_RATE, TELEGRAM_CHAT_RATE_PER_MIN, TELEGRAM_MAX_RETRIES, TELEGRAM_API_BASE,
+)
+from utils import get_http_session, setup_logger
+from instrumentation import timer, count
+
+logger = setup_logger()
+
+
+def never_sent(error):
+    """
+    True if a requests exception happened before the request reached
+    Telegram (DNS failure, refused or timed-out connect).
+    """
+    import requests
+    from urllib3.exceptions import NewConnectionError
+
+    if isinstance(error, requests.exceptions.ConnectTimeout):
+        return True
+    # requests wraps connect failures as ConnectionError(MaxRetryError(reason=...));
+    # a connection dropped while reading the answer is a ProtocolError instead
+    reason = getattr(error.args[0], "reason", None) if error.args else None
+    return isinstance(error, requests.exceptions.ConnectionError) and isinstance(reason, NewConnectionError)
+
+
+class TokenBucket:
+    """
+    Allows `rate` acquisitions per second on average, with bursts up to `capacity`.
+    pause() stops all acquisitions for a while (used for Telegram's retry_after).
+    """
+    def __init__(self, rate, capacity=1):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self._loop = asyncio.get_running_loop()
+        self._updated = self._loop.time()
+        self._paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = self._loop.time()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def pause(self, seconds):
+        self._paused_until = max(self._paused_until, self._loop.time() + seconds)
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = self._loop.time()
+                if now < self._paused_until:
+                    await asyncio.sleep(self._paused_until - now)
+                    continue
+                self._refill()
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class TelegramSender:
+    def __init__(self, token, session=None, global_rate=TELEGRAM_GLOBAL_RATE,
+                 chat_rate_per_min=TELEGRAM_CHAT_RATE_PER_MIN, max_retries=TELEGRAM_MAX_RETRIES,
+                 api_base=TELEGRAM_API_BASE):
+        self.base_url = f"{api_base}/bot{token}"
+        self.session = session or get_http_session()
+        self.max_retries = max_retries
+        self.chat_rate = chat_rate_per_min / 60
+        self.global_bucket = TokenBucket(global_rate, capacity=max(1, int(global_rate)))
+        self.chat_buckets = {}
+
+    def _chat_bucket(self, chat_id):
+        if chat_id not in self.chat_buckets:
+            self.chat_buckets[chat_id] = TokenBucket(self.chat_rate)
+        return self.chat_buckets[chat_id]
+
+    async def call(self, method, payload, files=None):
+        """
+        Calls a Bot API method and returns the decoded response body
+        ({"ok": true, "result": ...} on success). With `files` ({field: (name,
+        bytes, mime)}) the request is sent as multipart. Returns the last error
+        body once retries are exhausted, or None after a network error. None
+        after a timeout means the outcome is unknown; the call isn't repeated.
+        """
+        chat_bucket = self._chat_bucket(payload.get("chat_id"))
+        body = None
+        for attempt in range(self.max_retries + 1):
+            await chat_bucket.acquire()
+            await self.global_bucket.acquire()
+            try:
+                count("telegram_calls")
+                with timer("telegram", method=method):
+                    if files:
+                        response = await asyncio.to_thread(
+                            self.session.post, f"{self.base_url}/{method}", data=payload, files=files, timeout=60
+                        )
+                    else:
+                        response = await asyncio.to_thread(
+                            self.session.post, f"{self.base_url}/{method}", json=payload, timeout=30
+                        )
+            except Exception as e:
+                body = None
+                if not never_sent(e):
+                    count("telegram_unknown")
+                    logger.warning(f"⚠️ {method} to {payload.get('chat_id')} may or may not have gone through, "
+                                   f"not retrying: {e}")
+                    return None
+                logger.warning(f"⚠️ {method} to {payload.get('chat_id')} failed (attempt {attempt + 1}): {e}")
+                await asyncio.sleep(self._backoff(attempt))
+                continue
+            try:
+                body = response.json()
+            except ValueError:
+                body = {"ok": False, "error_code": response.status_code, "description": response.text[:200]}
+
+            if body.get("ok"):
+                return body
+            if response.status_code == 429:
+                # Flood control: wait exactly as long as Telegram asks. The limit may be
+                # bot-wide rather than per chat, so every chat waits
+                retry_after = body.get("parameters", {}).get("retry_after", 1)
+                count("telegram_429")
+                logger.warning(f"⏳ Rate limited on {payload.get('chat_id')}, retrying in {retry_after}s")
+                chat_bucket.pause(retry_after)
+                self.global_bucket.pause(retry_after)
+                continue
+            if response.status_code >= 500:
+                await asyncio.sleep(self._backoff(attempt))
+                continue
+            return body  # 4xx other than 429 won't succeed on retry
+        return body
+
+    @staticmethod
+    def _backoff(attempt):
+        return min(30, 2 ** attempt) + random.uniform(0, 0.5)
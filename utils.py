@@ -25,7 +25,10 @@ def shorten_offer_text(text, max_length=200):
     return text if len(text) <= max_length else text[:max_length].rstrip() + '...'
 
 import os
+import json
+import asyncio
 import logging
+from instrumentation import timer, count
 from datetime import datetime
 
 def setup_logger(name="bot_logger"):
@@ -48,3 +51,101 @@ def setup_logger(name="bot_logger"):
         logger.propagate = False
     return logger
 
+
+def load_json(path, default=None):
+    """
+    The JSON document at path, or `default` ({} if not given) when the file
+    is missing or unreadable - callers treat their state files as caches.
+    """
+    if not os.path.exists(path):
+        return {} if default is None else default
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except json.JSONDecodeError:
+        return {} if default is None else default
+
+
+def write_json_atomic(path, data, indent=2, sort_keys=True, separators=None):
+    """
+    Writes data to path.tmp and renames it over path, so a crash leaves either
+    the old file or the new one, never half of each.
+    """
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=indent, ensure_ascii=False, sort_keys=sort_keys, separators=separators)
+    os.replace(tmp_path, path)
+
+
+def write_jsonl_atomic(path, records):
+    """
+    Like write_json_atomic(), one compact JSON record per line.
+    """
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        for record in records:
+            f.write(json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n")
+    os.replace(tmp_path, path)
+
+
+READY_SELECTOR = 'meta[property="og:image"], meta[name="description"]'
+# Meta tags are usually in the server's HTML; pages without them shouldn't
+# spend the whole budget here before the DOM stability check
+READY_SELECTOR_MS = 1000
+
+async def wait_for_page_ready(page, url, goto_timeout=30000, max_wait_ms=5000):
+    """
+    Navigates to url and returns as soon as the page is usable for scraping:
+    the og:image / description meta tags are in the DOM and the element count
+    has stopped changing (or the network went idle). Never waits longer than
+    max_wait_ms after DOMContentLoaded.
+    """
+    loop = asyncio.get_running_loop()
+    with timer("goto"):
+        await page.goto(url, timeout=goto_timeout, wait_until="domcontentloaded")
+    count("round_trips")
+    deadline = loop.time() + max_wait_ms / 1000
+
+    def remaining_ms():
+        return max(0, int((deadline - loop.time()) * 1000))
+
+    try:
+        count("round_trips")
+        await page.wait_for_selector(READY_SELECTOR, state="attached", timeout=min(READY_SELECTOR_MS, remaining_ms()) or 1)
+    except Exception:
+        pass  # page has no meta tags - fall through to the DOM stability check
+
+    # DOM is "stable" once two polls in a row see the same number of elements
+    last_count = -1
+    while remaining_ms() > 0:
+        count("round_trips")
+        element_count = await page.evaluate("document.getElementsByTagName('*').length")
+        if element_count == last_count:
+            return
+        last_count = element_count
+        try:
+            count("round_trips")
+            await page.wait_for_load_state("networkidle", timeout=min(250, remaining_ms()) or 1)
+            return
+        except Exception:
+            pass
+
+
+_http_session = None
+
+def get_http_session(pool_size=16):
+    """
+    Returns a process-wide requests.Session with a connection pool, so
+    repeated calls to the same hosts reuse TCP/TLS connections.
+    """
+    global _http_session
+    if _http_session is None:
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        _http_session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        _http_session.mount("http://", adapter)
+        _http_session.mount("https://", adapter)
+        _http_session.headers["User-Agent"] = "Mozilla/5.0 (compatible; software-affiliate-bot)"
+    return _http_session